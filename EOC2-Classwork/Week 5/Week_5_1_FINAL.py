@@ -1,7 +1,7 @@
 import pandas as pd            # Data handling
-import seaborn as sns          # Plotting library for statistical data visualization
-import matplotlib.pyplot as plt  # Plotting library for custom graphs
 import streamlit as st         # Framework for creating interactive web apps
+from imputation import ImputationEngine  # Missing-data methods applied lazily, one column at a time
+from plots import distribution_png, nullity_bins, nullity_heatmap_png  # Charts drawn from binned summaries
 
 # ================================================================================
 # Missing Data & Data Quality Checks
@@ -22,8 +22,12 @@ This lecture covers:
 # ------------------------------------------------------------------------------
 # Load the Dataset
 # ------------------------------------------------------------------------------
-# Read the Titanic dataset from a CSV file into a pandas DataFrame.
-df = pd.read_csv("titanic.csv")
+# Read the Titanic dataset from a CSV file into a pandas DataFrame (only once; later reruns reuse the cached copy).
+@st.cache_data
+def load_data():
+    return pd.read_csv("titanic.csv")
+
+df = load_data()
 
 # ------------------------------------------------------------------------------
 # Display Summary Statistics
@@ -43,12 +47,16 @@ st.dataframe(df.isnull().sum())
 # Visualize Missing Data with a Heatmap
 # ------------------------------------------------------------------------------
 st.write("**Heatmap of Missing Values**")
-# Create a matplotlib figure and axis for the heatmap.
-fig, ax = plt.subplots()
-# Plot a heatmap where missing values are highlighted (using the 'viridis' color map, without a color bar).
-sns.heatmap(df.isnull(), cmap="viridis", cbar=False)
+# Instead of one cell per row, rows are grouped into at most 200 bins and each cell shows the share of missing
+# values in that bin, so the image stays the same size however many rows there are.
+# The finished image is cached, so it is only drawn once.
+@st.cache_data
+def missing_heatmap():
+    # Plot a heatmap where missing values are highlighted (using the 'viridis' color map, without a color bar).
+    return nullity_heatmap_png(nullity_bins(load_data()))
+
 # Render the heatmap in the Streamlit app.
-st.pyplot(fig)
+st.image(missing_heatmap())
 
 # ================================================================================
 # Interactive Missing Data Handling Section
@@ -71,31 +79,30 @@ method = st.radio("Choose a method", [
 ])
 
 # ------------------------------------------------------------------------------
-# Prepare a Copy of the DataFrame for Cleaning
-# ------------------------------------------------------------------------------
-# Create a copy to preserve the original data.
-df_clean = df.copy()
+# Apply the Selected Missing Data Handling Method (lazily)
+# ------------------------------------------------------------------------------
+# Instead of copying the whole DataFrame and then cleaning it, the ImputationEngine (imputation.py) works out
+# only the selected column after the selected method, from statistics it computes once and caches:
+# - "Original DF": the data unchanged
+# - "Drop Rows": the rows that contain no missing values at all (like dropna())
+# - "Drop Columns (>50% Missing)": columns where more than 50% of the values are missing are dropped
+# - "Impute Mean" / "Impute Median" / "Impute Zero": missing values in the selected column are replaced with the
+#   column's mean, median, or zero
+@st.cache_resource
+def get_engine():
+    return ImputationEngine(load_data())
 
+engine = get_engine()
+cleaned = engine.view(column, method)
+
+# ------------------------------------------------------------------------------
+# Cached Distribution Charts
 # ------------------------------------------------------------------------------
-# Apply the Selected Missing Data Handling Method
-# ------------------------------------------------------------------------------
-if method == "Original DF":
-    pass  # Keep the data unchanged.
-elif method == "Drop Rows":
-    # Remove all rows that contain any missing values.
-    df_clean = df_clean.dropna()
-elif method == "Drop Columns (>50% Missing)":
-    # Drop columns where more than 50% of the values are missing.
-    df_clean = df_clean.drop(columns=df_clean.columns[df_clean.isnull().mean() > 0.5])
-elif method == "Impute Mean":
-    # Replace missing values in the selected column with the column's mean.
-    df_clean[column] = df_clean[column].fillna(df[column].mean())
-elif method == "Impute Median":
-    # Replace missing values in the selected column with the column's median.
-    df_clean[column] = df_clean[column].fillna(df[column].median())
-elif method == "Impute Zero":
-    # Replace missing values in the selected column with zero.
-    df_clean[column] = df_clean[column].fillna(0)
+# Each histogram (with its KDE line) is drawn from bin counts and cached per (column, method),
+# so switching back to a column/method that was already shown doesn't redraw anything.
+@st.cache_data
+def distribution_chart(column, method, title, _view):
+    return distribution_png(_view.values(), title)  # The cleaned values are only worked out on a cache miss
 
 # ------------------------------------------------------------------------------
 # Side-by-Side Visualization: Original vs. Cleaned Data
@@ -107,22 +114,19 @@ col1, col2 = st.columns(2)
 with col1:
     st.subheader("Original Data Distribution")
     # Plot a histogram (with a KDE) for the selected column from the original DataFrame.
-    fig, ax = plt.subplots()
-    sns.histplot(df[column].dropna(), kde=True)
-    plt.title(f"Original Distribution of {column}")
-    st.pyplot(fig)
+    st.image(distribution_chart(column, "Original DF", f"Original Distribution of {column}", engine.view(column, "Original DF")))
     st.subheader(f"{column}'s Original Stats")
     # Display statistical summary for the selected column.
-    st.write(df[column].describe())
+    st.write(engine.describe(column, "Original DF"))
 
 # --- Cleaned Data Visualization ---
 with col2:
     st.subheader("Cleaned Data Distribution")
-    # Plot a histogram (with a KDE) for the selected column from the cleaned DataFrame.
-    fig, ax = plt.subplots()
-    sns.histplot(df_clean[column], kde=True)
-    plt.title(f"Distribution of {column} after {method}")
-    st.pyplot(fig)
-    st.subheader(f"{column}'s New Stats")
-    # Display statistical summary for the cleaned data.
-    st.write(df_clean[column].describe())
\ No newline at end of file
+    if cleaned.dropped:
+        st.write(f"{column} is dropped by this method (more than 50% of its values are missing).")
+    else:
+        # Plot a histogram (with a KDE) for the selected column from the cleaned data.
+        st.image(distribution_chart(column, method, f"Distribution of {column} after {method}", cleaned))
+        st.subheader(f"{column}'s New Stats")
+        # Display statistical summary for the cleaned data.
+        st.write(engine.describe(column, method))
\ No newline at end of file
@@ -1,9 +1,9 @@
 import pandas as pd  # For data manipulation
-import numpy as np  # For numerical operations
 import streamlit as st  # For creating the interactive app
 import seaborn as sns  # For easy dataset loading and visualizations
 import matplotlib.pyplot as plt  # For plotting
-from scipy.stats import iqr # For getting the iqr
+import os  # For checking the path of a CSV to profile
+from profiler import profile_csv, profile_frame  # Single-pass profiler (quantile sketch, running stats, row hashes)
 
 # ------------------------------------------------------------------------------
 # Lecture: Data Validation, Outliers, Inconsistencies & Errors in Data
@@ -19,9 +19,23 @@ This lecture covers:
 # ------------------------------------------------------------------------------
 # Load a different dataset: the 'tips' dataset from seaborn
 # ------------------------------------------------------------------------------
-df = sns.load_dataset("tips")
-# Appending a negative tip
-df.loc[-1] = [-25, -5, "Male", "Yes", "Jan", "Midnight", 30]
+# Loaded once and cached, instead of on every widget change
+@st.cache_data
+def load_tips():
+    df = sns.load_dataset("tips")
+    # Appending a negative tip
+    df.loc[-1] = [-25, -5, "Male", "Yes", "Jan", "Midnight", 30]
+    return df
+
+df = load_tips()
+
+# Profile the data once: data types, missing values, quantiles and duplicate rows all come from a single pass
+# (see profiler.py), so changing the selected column below doesn't re-sort anything
+@st.cache_resource
+def get_profile():
+    return profile_frame(load_tips())
+
+profile = get_profile()
 
 st.header("1. Data Validation")
 st.subheader("Data Overview")
@@ -31,11 +45,11 @@ st.dataframe(df.head())
 
 st.subheader("Data Types & Missing Values")
 st.write("Data Types:")
-st.code("df.dtypes")
-st.write(df.dtypes)
+st.code("profile.dtypes()  # same as df.dtypes")
+st.write(profile.dtypes().astype(str))
 st.write("Missing Values per Column:")
-st.code("df.isnull().sum()")
-st.write(df.isnull().sum())
+st.code("profile.missing()  # same as df.isnull().sum()")
+st.write(profile.missing())
 
 # ------------------------------------------------------------------------------
 # Detecting Outliers in a Numerical Column ('total_bill')
@@ -50,21 +64,20 @@ sns.boxplot(x=df[column])
 ax1.set_title(f"Boxplot of {column}")
 st.pyplot(fig1)
 
-# Calculate IQR for 'total_bill' to identify outliers
-# Compute Q1 and Q3 using numpy
-Q1, Q3 = np.percentile(df[column].dropna(), [25, 75])
-IQR = iqr(df[column].dropna())
+# Calculate IQR for the selected column to identify outliers
+# Q1 and Q3 come from the profiler's quantile sketch (exact for a dataset this size) instead of sorting the column
+if profile.columns[column].numeric:
+    Q1, Q3, IQR, lower_bound, upper_bound = profile.columns[column].iqr_bounds()
 
-lower_bound = Q1 - 1.5 * IQR
-upper_bound = Q3 + 1.5 * IQR
+    st.write(f"Lower Bound: {lower_bound:.2f}")
+    st.write(f"Upper Bound: {upper_bound:.2f}")
 
-st.write(f"Lower Bound: {lower_bound:.2f}")
-st.write(f"Upper Bound: {upper_bound:.2f}")
-
-# Identify outliers in 'total_bill'
-outliers = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
-st.write(f"Rows with outliers in '{column}':")
-st.dataframe(outliers)
+    # Identify outliers in the selected column
+    outliers = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
+    st.write(f"Rows with outliers in '{column}':")
+    st.dataframe(outliers)
+else:
+    st.write(f"'{column}' isn't numeric, so the IQR method doesn't apply.")
 
 # ------------------------------------------------------------------------------
 # Identifying Inconsistencies and Errors
@@ -73,9 +86,10 @@ st.header("3. Identifying Inconsistencies and Errors")
 st.subheader("Duplicate Records")
 
 # Check for duplicate rows in the dataset
-duplicate_count = df.duplicated().sum()
-st.write(f"Number of duplicate rows: {duplicate_count}")
-st.dataframe(df[df.duplicated() == 1])
+# The profiler hashed every row while reading, so this doesn't compare whole rows again
+duplicate_positions = profile.duplicate_positions()
+st.write(f"Number of duplicate rows: {len(duplicate_positions)}")
+st.dataframe(df.iloc[duplicate_positions])
 
 # For demonstration, let's simulate an inconsistency:
 # Assume that a negative tip value is an error.
@@ -89,6 +103,33 @@ else:
     st.write("Negative tip values detected:")
     st.dataframe(negative_tips)
 
+# ------------------------------------------------------------------------------
+# Profiling a Large CSV
+# ------------------------------------------------------------------------------
+st.header("4. Profiling a Large CSV")
+st.write("The same checks for a CSV file on the server of any size: it is read once in chunks, keeping only running statistics, a small quantile sketch per column and one hash per row.")
+csv_path = st.text_input("Path to a CSV file").strip()
+
+@st.cache_data(show_spinner="Profiling... (one pass over the file)")
+def profile_report(path, modified):
+    # modified (the file's modification time) is part of the cache key, so an updated file is profiled again
+    report = profile_csv(path)
+    return report.rows, report.dtypes().astype(str), report.missing(), report.summary(), report.duplicate_count()
+
+if csv_path:
+    if not os.path.isfile(csv_path):
+        st.error(f"File not found: {csv_path}")
+    else:
+        rows, dtypes, missing, summary, duplicates = profile_report(csv_path, os.path.getmtime(csv_path))
+        st.write(f"Rows: {rows:,} | Duplicate rows: {duplicates:,}")
+        col1, col2 = st.columns(2)
+        col1.write("Data Types:")
+        col1.write(dtypes)
+        col2.write("Missing Values per Column:")
+        col2.write(missing)
+        st.write("Numeric columns (quartiles are approximate for large files; outliers are estimated from the sketch):")
+        st.dataframe(summary)
+
 # ------------------------------------------------------------------------------
 # Final Notes
 # ------------------------------------------------------------------------------
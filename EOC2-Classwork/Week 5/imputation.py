@@ -0,0 +1,112 @@
+# Missing-data strategies as lazy views over the original table
+# The lecture app used to copy the whole DataFrame on every rerun and then change one column (or drop rows/columns).
+# Here each strategy is just a description of what would change: the cleaned values are only worked out for the
+# column being looked at, from statistics (null mask, mean, median, rows without missing values) that are computed
+# once per column and cached. Showing "before" and "after" for a column then costs one pass over that column
+# instead of a copy of the whole table.
+import numpy as np
+import pandas as pd
+
+METHODS = ["Original DF", "Drop Rows", "Drop Columns (>50% Missing)", "Impute Mean", "Impute Median", "Impute Zero"]
+DROP_COLUMN_SHARE = 0.5 # "Drop Columns" removes columns with more than this share of missing values
+
+
+class ImputationEngine:
+    """Caches per-column statistics of df and hands out CleanedColumn views."""
+
+    def __init__(self, df):
+        self.df = df # Never modified
+        self._null_masks = {}
+        self._fill_values = {}
+        self._complete_rows = None
+        self._missing_share = None
+        self._describe = {}
+
+    def null_mask(self, column):
+        if column not in self._null_masks:
+            self._null_masks[column] = self.df[column].isnull().to_numpy()
+        return self._null_masks[column]
+
+    def fill_value(self, column, method):
+        """Mean, median or 0 for the "Impute ..." methods (computed once per column)."""
+        key = (column, method)
+        if key not in self._fill_values:
+            if method == "Impute Mean":
+                self._fill_values[key] = self.df[column].mean()
+            elif method == "Impute Median":
+                self._fill_values[key] = self.df[column].median()
+            else:
+                self._fill_values[key] = 0
+        return self._fill_values[key]
+
+    def complete_rows(self):
+        """Boolean mask of the rows with no missing values (what dropna() keeps)."""
+        if self._complete_rows is None:
+            self._complete_rows = ~self.df.isnull().to_numpy().any(axis=1)
+        return self._complete_rows
+
+    def missing_share(self):
+        if self._missing_share is None:
+            self._missing_share = self.df.isnull().mean()
+        return self._missing_share
+
+    def dropped_columns(self):
+        """Columns that "Drop Columns (>50% Missing)" removes."""
+        share = self.missing_share()
+        return list(share.index[share > DROP_COLUMN_SHARE])
+
+    def view(self, column, method):
+        return CleanedColumn(self, column, method)
+
+    def describe(self, column, method):
+        """describe() of the column after the method, cached per (column, method)."""
+        key = (column, method)
+        if key not in self._describe:
+            self._describe[key] = self.view(column, method).describe()
+        return self._describe[key]
+
+
+class CleanedColumn:
+    """One column of the table as it would look after a missing-data method, worked out only when asked."""
+
+    def __init__(self, engine, column, method):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method!r}")
+        self.engine = engine
+        self.column = column
+        self.method = method
+
+    @property
+    def dropped(self):
+        """True if the method removes this column altogether."""
+        return self.method == "Drop Columns (>50% Missing)" and self.column in self.engine.dropped_columns()
+
+    def values(self):
+        """The column's values after the method (NaN where a value is still missing)."""
+        original = self.engine.df[self.column]
+        if self.method in ("Original DF", "Drop Columns (>50% Missing)"):
+            return original.to_numpy()
+        if self.method == "Drop Rows":
+            return original.to_numpy()[self.engine.complete_rows()]
+        # Impute: only this column's missing positions change
+        mask = self.engine.null_mask(self.column)
+        if not mask.any():
+            return original.to_numpy() # Nothing to fill (and the column keeps its type, like fillna)
+        return np.where(mask, self.engine.fill_value(self.column, self.method), original.to_numpy())
+
+    def series(self):
+        return pd.Series(self.values(), name=self.column)
+
+    def describe(self):
+        return self.series().describe()
+
+    def frame(self):
+        """The whole cleaned table - only built if something really needs every column."""
+        df = self.engine.df
+        if self.method == "Original DF":
+            return df
+        if self.method == "Drop Rows":
+            return df[self.engine.complete_rows()]
+        if self.method == "Drop Columns (>50% Missing)":
+            return df.drop(columns=self.engine.dropped_columns())
+        return df.assign(**{self.column: self.values()})
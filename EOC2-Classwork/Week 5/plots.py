@@ -0,0 +1,90 @@
+# Rendering helpers for the missing-data lecture (Week_5_1_FINAL.py)
+# The charts are drawn from small summaries instead of from every row, so each one takes about the same time no
+# matter how long the table is:
+#   - the missing-value heatmap shows the share of missing values in bins of rows (at most MAX_HEATMAP_ROWS bins)
+#     rather than one cell per row
+#   - histograms are drawn from precomputed bin counts
+#   - the KDE curve is a binned estimate: values are counted on a fine grid and smoothed with a Gaussian kernel
+#     using an FFT convolution, instead of evaluating a kernel for every data point
+# Every function returns PNG bytes (or plain arrays), so the app can cache the finished images.
+import io
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from scipy.signal import fftconvolve
+
+MAX_HEATMAP_ROWS = 200 # Row bins in the missing-value heatmap
+MAX_BINS = 100 # Histogram bars
+KDE_GRID = 1024 # Grid points for the binned KDE
+
+
+def to_png(fig):
+    """Render a figure to PNG bytes and close it."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def nullity_bins(df, max_rows=MAX_HEATMAP_ROWS):
+    """Share of missing values per (bin of consecutive rows, column); at most max_rows bins."""
+    if len(df) == 0:
+        return pd.DataFrame(np.zeros((0, df.shape[1])), columns=df.columns)
+    missing = df.isnull().to_numpy()
+    starts = np.unique(np.linspace(0, len(df), min(len(df), max_rows), endpoint=False).astype(int))
+    sizes = np.diff(np.append(starts, len(df)))
+    shares = np.add.reduceat(missing.astype("int32"), starts, axis=0) / sizes[:, None]
+    return pd.DataFrame(shares, index=starts, columns=df.columns)
+
+
+def nullity_heatmap_png(shares):
+    """Heatmap of nullity_bins (yellow = missing, like sns.heatmap(df.isnull(), cmap="viridis"))."""
+    fig, ax = plt.subplots()
+    sns.heatmap(shares, cmap="viridis", cbar=False, vmin=0, vmax=1, ax=ax)
+    ax.set_ylabel("Row")
+    return to_png(fig)
+
+
+def histogram(values, max_bins=MAX_BINS):
+    """(counts, edges) with numpy's automatic bin choice, capped at max_bins bars."""
+    values = values[~np.isnan(values)]
+    edges = np.histogram_bin_edges(values, bins="auto") if len(values) else np.array([0.0, 1.0])
+    if len(edges) - 1 > max_bins:
+        edges = np.linspace(edges[0], edges[-1], max_bins + 1)
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+def binned_kde(values, grid_size=KDE_GRID):
+    """(x, density) of a Gaussian KDE with Scott's bandwidth (what seaborn uses), computed on a binned grid."""
+    values = values[~np.isnan(values)]
+    n = len(values)
+    std = values.std(ddof=1) if n > 1 else 0.0
+    if n < 2 or std == 0:
+        return np.array([]), np.array([])
+    bandwidth = std * n ** (-1 / 5)
+    low, high = values.min() - 3 * bandwidth, values.max() + 3 * bandwidth
+    counts, edges = np.histogram(values, bins=grid_size, range=(low, high))
+    step = edges[1] - edges[0]
+    # Kernel weights out to 4 bandwidths on each side, then one FFT convolution over the whole grid
+    reach = min(int(np.ceil(4 * bandwidth / step)), grid_size)
+    offsets = np.arange(-reach, reach + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = fftconvolve(counts, kernel, mode="same") / (n * bandwidth * np.sqrt(2 * np.pi))
+    return (edges[:-1] + edges[1:]) / 2, np.clip(density, 0, None)
+
+
+def distribution_png(values, title):
+    """Histogram with a KDE line, like sns.histplot(values, kde=True), drawn from bin counts."""
+    values = np.asarray(values, dtype="float64")
+    counts, edges = histogram(values)
+    x, density = binned_kde(values)
+    fig, ax = plt.subplots()
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", alpha=0.5, edgecolor="white")
+    if len(x):
+        ax.plot(x, density * counts.sum() * np.diff(edges).mean()) # Density scaled to the histogram's counts
+    ax.set_ylabel("Count")
+    ax.set_title(title)
+    return to_png(fig)
@@ -0,0 +1,235 @@
+# Single-pass data-quality profiler
+# Produces the data validation report from Week_5_2 (data types, missing values, IQR outlier bounds, duplicate rows)
+# while reading the data once, chunk by chunk, so it works for CSVs far bigger than memory:
+#   - quantiles (Q1, median, Q3) come from a KLL sketch: a few thousand sampled values per column instead of a
+#     sorted copy of the whole column. The results are exact while a column has fewer than k values, and within
+#     about a percent of rank otherwise
+#   - mean and variance are updated per chunk with Welford's/Chan's formula, so no second pass is needed
+#   - duplicate rows are found from a 64-bit hash per row instead of comparing whole rows
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+CHUNKSIZE = 100_000 # Rows read per chunk by profile_csv
+
+
+class KLLSketch:
+    """Mergeable quantile sketch: level h holds values that each stand for 2**h original values."""
+
+    def __init__(self, k=2048, seed=0):
+        self.k = k
+        self.levels = [np.array([], dtype="float64")]
+        self.n = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def merge(self, other):
+        """Add another sketch's values into this one."""
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.array([], dtype="float64"))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compact()
+
+    def _compact(self):
+        # Any level with k or more values is sorted and every other value (starting at a random 0/1 offset) moves up
+        # a level with double the weight; an odd value out stays behind
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) >= self.k:
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.array([], dtype="float64"))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], pairs[self._rng.integers(2)::2]])
+                self.levels[h] = keep
+            h += 1
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def exact(self):
+        return len(self.levels) == 1 # Nothing has been compacted, so every value is still here
+
+    def quantile(self, q):
+        """Approximate q-th quantiles (q in [0, 1]); the same as np.percentile while the sketch is exact."""
+        q = np.asarray(q, dtype="float64")
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        if self.exact():
+            return np.percentile(self.levels[0], q * 100)
+        values, weights = self._weighted()
+        # Each value sits at the middle of the ranks it stands for; interpolate between those positions
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(q, positions, values)
+
+    def rank(self, x):
+        """Approximate number of values <= x."""
+        values, weights = self._weighted()
+        return float(weights[:np.searchsorted(values, x, side="right")].sum())
+
+
+def _common_dtype(a, b):
+    # Chunks of a CSV can disagree (e.g. int64 in one, float64 in another where a value was missing)
+    if a == b:
+        return a
+    if isinstance(a, np.dtype) and isinstance(b, np.dtype) and is_numeric_dtype(a) and is_numeric_dtype(b):
+        return np.result_type(a, b)
+    return np.dtype(object)
+
+
+class ColumnProfile:
+    """Running statistics for one column."""
+
+    def __init__(self, name, k=2048):
+        self.name = name
+        self.dtype = None
+        self.count = 0 # Non-missing values
+        self.nulls = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared differences from the mean (for the variance)
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = KLLSketch(k)
+
+    @property
+    def numeric(self):
+        return self.dtype is not None and is_numeric_dtype(self.dtype) and not is_bool_dtype(self.dtype)
+
+    def update(self, series):
+        self.dtype = series.dtype if self.dtype is None else _common_dtype(self.dtype, series.dtype)
+        missing = series.isna()
+        self.nulls += int(missing.sum())
+        if not (is_numeric_dtype(series.dtype) and not is_bool_dtype(series.dtype)):
+            self.count += int((~missing).sum())
+            return
+        values = series[~missing].to_numpy(dtype="float64")
+        if not len(values):
+            return
+        # Chan et al.'s way of combining the mean/variance of this chunk with everything seen so far
+        n_b, mean_b = len(values), values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta ** 2 * self.count * n_b / n
+        self.count = n
+        self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+        self.sketch.update(values)
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan # ddof=1, like pandas
+
+    def iqr_bounds(self):
+        """(Q1, Q3, IQR, lower bound, upper bound) for the 1.5 x IQR outlier rule."""
+        q1, q3 = self.sketch.quantile([0.25, 0.75])
+        iqr = q3 - q1
+        return q1, q3, iqr, q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+
+def _row_hashes(chunk):
+    # Numbers are hashed as float64 so that 1 in one chunk and 1.0 in another (where a missing value made the
+    # column float) count as the same value. Adding 0.0 turns -0.0 into 0.0, which df.duplicated() treats as equal
+    # but which would otherwise hash differently
+    columns = {col: chunk[col].astype("float64") + 0.0 if is_numeric_dtype(chunk[col].dtype) else chunk[col] for col in chunk.columns}
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+class DataProfiler:
+    """Feed it chunks of a table with update(); read the report with the methods below."""
+
+    def __init__(self, k=2048):
+        self.k = k
+        self.columns = {}
+        self.rows = 0
+        self._hashes = [] # One uint64 per row; the only thing kept for every row
+
+    def update(self, chunk):
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnProfile(col, self.k)
+            self.columns[col].update(chunk[col])
+        self._hashes.append(_row_hashes(chunk))
+        self.rows += len(chunk)
+        return self
+
+    def dtypes(self):
+        return pd.Series({name: profile.dtype for name, profile in self.columns.items()}, dtype=object)
+
+    def missing(self):
+        return pd.Series({name: profile.nulls for name, profile in self.columns.items()})
+
+    def summary(self):
+        """describe()-style table of the numeric columns, plus the IQR outlier bounds."""
+        rows = {}
+        for name, profile in self.columns.items():
+            if not profile.numeric:
+                continue
+            q1, q3, iqr, lower, upper = profile.iqr_bounds()
+            rows[name] = {"count": profile.count, "mean": profile.mean, "std": profile.std, "min": profile.min,
+                          "25%": q1, "50%": profile.sketch.quantile(0.5), "75%": q3, "max": profile.max,
+                          "IQR": iqr, "lower bound": lower, "upper bound": upper,
+                          # Estimated from the sketch, so it needs no second pass over the data
+                          "outliers": profile.sketch.rank(np.nextafter(lower, -np.inf)) + profile.count - profile.sketch.rank(upper)}
+        return pd.DataFrame(rows).T
+
+    def duplicate_positions(self):
+        """Row positions (0-based, in reading order) of rows that repeat an earlier row, like df.duplicated()."""
+        if not self._hashes:
+            return np.array([], dtype=int)
+        hashes = np.concatenate(self._hashes)
+        _, first = np.unique(hashes, return_index=True)
+        duplicated = np.ones(len(hashes), dtype=bool)
+        duplicated[first] = False
+        return np.flatnonzero(duplicated)
+
+    def duplicate_count(self):
+        return len(self.duplicate_positions())
+
+
+def profile_frame(df, chunksize=CHUNKSIZE, k=2048):
+    """Profile a DataFrame that is already in memory (in chunks, so the same code path as a CSV)."""
+    profiler = DataProfiler(k)
+    for start in range(0, len(df), chunksize):
+        profiler.update(df.iloc[start:start + chunksize])
+    return profiler
+
+
+def profile_csv(path, chunksize=CHUNKSIZE, k=2048, progress=None):
+    """Profile a CSV of any size in one pass. progress, if given, is called with the rows read so far."""
+    profiler = DataProfiler(k)
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        profiler.update(chunk)
+        if progress is not None:
+            progress(profiler.rows)
+    return profiler
+
+
+def _self_check():
+    # Compares the profiler's duplicate rows with df.duplicated() on a table with the awkward cases (-0.0 vs 0.0,
+    # missing values, ints vs floats split across chunks). Run with: python profiler.py
+    df = pd.DataFrame({"a": [0.0, -0.0, np.nan, np.nan, 1.0, 1.0, 2.0], "b": ["x", "x", "y", "y", "z", "z", "z"]})
+    expected = np.flatnonzero(df.duplicated().to_numpy())
+    for chunksize in (1, 2, len(df)):
+        found = profile_frame(df, chunksize=chunksize).duplicate_positions()
+        assert np.array_equal(found, expected), (chunksize, found, expected)
+    ints = pd.DataFrame({"a": [1, 2]})
+    floats = pd.DataFrame({"a": [1.0, np.nan]})
+    assert DataProfiler().update(ints).update(floats).duplicate_positions().tolist() == [2]
+    print("duplicate rows match df.duplicated()")
+
+
+if __name__ == "__main__":
+    _self_check()
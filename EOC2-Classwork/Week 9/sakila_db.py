@@ -0,0 +1,171 @@
+# Shared data access for the Sakila notebooks (and any Streamlit front end serving the same reports)
+# Instead of every notebook/session opening its own sqlite3.connect("sakila.db") and re-running the same joins:
+#   - a small pool of read-only connections is shared between threads (with enable_wal=True the database is switched
+#     to WAL mode, which lets readers run alongside a writer; it is off by default because it changes the file for good)
+#   - each connection keeps its compiled statements (sqlite3's statement cache), so repeated SQL isn't re-parsed
+#   - finished results are cached by (normalized SQL, parameters), and the whole cache is dropped as soon as the
+#     database file (or its WAL file) changes on disk. The normalized SQL is only the cache key: the query that runs
+#     is always the SQL exactly as it was passed in
+#   - big results can be read in chunks with iter_query instead of one huge DataFrame
+#
+# Usage:
+#   from sakila_db import SakilaDB
+#   db = SakilaDB("sakila.db")
+#   df = db.query("SELECT * FROM film WHERE rating = ?", ("PG",))
+import os
+import queue
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+# Quoted strings/identifiers (kept as they are), or a run of whitespace and comments (collapsed to one space)
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|((?:\s+|--[^\n]*|/\*.*?(?:\*/|$))+)""", re.S)
+
+
+def normalize_sql(sql):
+    """Cache key for a query: comments removed, whitespace collapsed and a trailing semicolon dropped, so the same
+    query written differently shares a cache entry.
+
+    Text inside quotes is left alone, since it is part of the query's meaning. Comments are removed before the
+    whitespace is collapsed, so a -- comment can never swallow the lines after it.
+    """
+    collapsed = _SQL_TOKENS.sub(lambda m: m.group(1) or " ", sql)
+    return collapsed.strip().rstrip(";").strip()
+
+
+class SakilaDB:
+    """Thread-safe connection pool plus result cache for a SQLite database."""
+
+    def __init__(self, path="sakila.db", pool_size=4, cache_entries=128, cached_statements=256, enable_wal=False):
+        """Open the pool for the database at path (no connections are made until the first query).
+
+        enable_wal=True switches the database file to WAL mode so readers never wait for a writer. This is a
+        permanent change to the file (it also creates -wal/-shm files next to it), so it is off by default.
+        """
+        self.path = os.path.abspath(path)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        self.pool_size = pool_size
+        self.cached_statements = cached_statements
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._pool_lock = threading.Lock()
+        self._cache = OrderedDict() # (normalized SQL, params) -> DataFrame, least recently used first
+        self._cache_entries = cache_entries
+        self._cache_lock = threading.Lock()
+        self._version = self._file_version()
+        self.hits = self.misses = 0
+        if enable_wal:
+            self._enable_wal()
+
+    def _enable_wal(self):
+        # WAL is a property of the database file, so it's set once through a normal (writable) connection.
+        # If the file can't be written, readers just keep using the default journal mode.
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            pass
+
+    def _connect(self):
+        uri = Path(self.path).resolve().as_uri() + "?mode=ro" # as_uri() percent-encodes ?, #, % and the rest
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=self.cached_statements)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a read-only connection from the pool (opening a new one if fewer than pool_size exist)."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._pool_lock:
+                        self._created -= 1 # The failed open doesn't count, so later callers don't wait forever
+                    raise
+            else:
+                conn = self._pool.get() # Wait for one to be returned
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _file_version(self):
+        # Writes in WAL mode land in the -wal file first, so both files are checked
+        version = []
+        for path in (self.path, self.path + "-wal"):
+            try:
+                stat = os.stat(path)
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version)
+
+    def _check_version(self):
+        version = self._file_version()
+        if version != self._version:
+            with self._cache_lock:
+                self._cache.clear()
+                self._version = version
+        return version
+
+    def query(self, sql, params=None):
+        """Run a query and return a DataFrame, from the cache if the same query ran since the database last changed."""
+        version = self._check_version()
+        key = (normalize_sql(sql), tuple(params) if isinstance(params, (list, tuple)) else tuple(sorted((params or {}).items())))
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key].copy() # A copy, so callers can't change the cached result
+        self.misses += 1
+        with self.connection() as conn:
+            df = pd.read_sql(sql, conn, params=params)
+        with self._cache_lock:
+            if self._version == version: # Skip caching if the database changed while the query ran
+                self._cache[key] = df
+            while len(self._cache) > self._cache_entries:
+                self._cache.popitem(last=False)
+        return df.copy()
+
+    def iter_query(self, sql, params=None, chunksize=10_000):
+        """Yield the result of a (large) query as DataFrames of up to chunksize rows. Not cached."""
+        with self.connection() as conn:
+            yield from pd.read_sql(sql, conn, params=params, chunksize=chunksize)
+
+    def query_plan(self, sql, params=None):
+        """SQLite's EXPLAIN QUERY PLAN for a query."""
+        with self.connection() as conn:
+            return pd.read_sql("EXPLAIN QUERY PLAN " + sql, conn, params=params)
+
+    def full_scans(self, sql, params=None):
+        """Plan steps that read a whole table without an index - candidates for a new index."""
+        plan = self.query_plan(sql, params)
+        return [detail for detail in plan["detail"] if detail.startswith("SCAN") and "INDEX" not in detail]
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def close(self):
+        """Close every pooled connection."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._pool_lock:
+            self._created = 0
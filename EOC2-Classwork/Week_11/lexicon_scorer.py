@@ -0,0 +1,69 @@
+# Batch lexicon sentiment scoring
+# Scores many reviews at once instead of one at a time: every review is lowercased and split on whitespace (the
+# same tokens as text.lower().split()), the tokens of a whole batch are looked up in the lexicon's vocabulary in one
+# pass, and the scores come from a sparse (reviews x lexicon words) count matrix multiplied by the word weights.
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DEFAULT_LEXICON = {
+    "good": 1, "great": 2, "excellent": 3,
+    "bad": -2, "poor": -3, "terrible": -5
+}
+BATCH_SIZE = 100_000 # Reviews tokenized at a time, so memory doesn't grow with the number of reviews
+SEPARATOR = "\x00" # Marks where one review ends when a batch is tokenized as one string
+
+
+class LexiconScorer:
+    """Rule-based sentiment scorer for a {word: weight} lexicon."""
+
+    def __init__(self, lexicon=None):
+        lexicon = {word.lower(): weight for word, weight in (lexicon or DEFAULT_LEXICON).items()}
+        self.vocab = list(lexicon) # Column order of the count matrix
+        self.weights = np.array(list(lexicon.values()), dtype="float64")
+        self.lookup = {word: i for i, word in enumerate(self.vocab)}
+        self.lookup[SEPARATOR] = -2
+
+    @classmethod
+    def from_csv(cls, path):
+        """Load a custom lexicon from a CSV with word and weight columns."""
+        df = pd.read_csv(path)
+        return cls(dict(zip(df["word"].astype(str), df["weight"])))
+
+    def counts(self, texts):
+        """Sparse matrix with how often each lexicon word appears in each review."""
+        texts = [text.replace(SEPARATOR, " ") if SEPARATOR in text else text for text in texts]
+        # Lowercasing and splitting one big string is much faster than doing it review by review. The separator
+        # token between reviews maps to -2, everything else to its column in the lexicon or -1 if it isn't in it
+        tokens = f" {SEPARATOR} ".join(texts).lower().split()
+        ids = np.fromiter(map(self.lookup.get, tokens, repeat(-1)), dtype="int64", count=len(tokens))
+        review = np.cumsum(ids == -2) # Review number of every token
+        hit = ids >= 0
+        return sparse.csr_matrix((np.ones(int(hit.sum())), (review[hit], ids[hit])), shape=(len(texts), len(self.vocab)))
+
+    def score_batches(self, texts, batch_size=BATCH_SIZE):
+        """Yield the score array of each batch of batch_size reviews."""
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield self.counts(batch) @ self.weights
+                batch = []
+        if batch:
+            yield self.counts(batch) @ self.weights
+
+    def scores(self, texts, batch_size=BATCH_SIZE):
+        """Sum of the lexicon weights of the words in each review (a Series or any iterable of strings)."""
+        parts = list(self.score_batches(texts, batch_size))
+        return np.concatenate(parts) if parts else np.array([], dtype="float64")
+
+    def labels(self, texts, batch_size=BATCH_SIZE):
+        """Label each review "positive" if its score is above 0, otherwise "negative"."""
+        return to_labels(self.scores(texts, batch_size))
+
+
+def to_labels(scores):
+    """Turn scores into "positive"/"negative" labels."""
+    return np.where(np.asarray(scores) > 0, "positive", "negative")
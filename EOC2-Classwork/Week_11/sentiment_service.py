@@ -0,0 +1,221 @@
+# Sentiment service: one place to run the rule-based, VADER and transformer analyzers from Week 10 over many reviews
+# - the transformer pipeline is called on batches of reviews instead of one review per call
+# - VADER is pure Python, so reviews are spread over a pool of worker processes
+# - every result is saved in a small SQLite file keyed by (model id, hash of the review text), so duplicate reviews
+#   and reruns on the same data are never scored twice
+# compare() runs several engines side by side over a DataFrame and reports how fast each one was.
+#
+# Usage: python sentiment_service.py reviews.csv --column review --engines rule vader transformer
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from lexicon_scorer import LexiconScorer
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), ".cache", "sentiment.sqlite")
+ENGINE_COLUMNS = {"rule": "rule_based_sent", "vader": "vader_sent", "transformer": "transformer_sent"} # Same names as the Week 10 notebook
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of (label, score) per (model id, text hash)."""
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results (model TEXT, hash TEXT, label TEXT, score REAL, PRIMARY KEY (model, hash))")
+
+    def get_many(self, model, hashes, chunk=500):
+        """{hash: (label, score)} for the hashes already scored by this model."""
+        found = {}
+        hashes = list(hashes)
+        for start in range(0, len(hashes), chunk): # SQLite limits the number of ? in one query
+            part = hashes[start:start + chunk]
+            rows = self.conn.execute(f"SELECT hash, label, score FROM results WHERE model = ? AND hash IN ({','.join('?' * len(part))})", [model, *part])
+            found.update({h: (label, score) for h, label, score in rows})
+        return found
+
+    def put_many(self, model, items):
+        """Store (hash, label, score) tuples for this model."""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", [(model, h, label, score) for h, label, score in items])
+
+    def close(self):
+        self.conn.close()
+
+
+class RuleEngine:
+    """The lexicon analyzer, scored in batches by LexiconScorer."""
+
+    def __init__(self, scorer=None):
+        self.scorer = scorer or LexiconScorer()
+        lexicon = dict(zip(self.scorer.vocab, self.scorer.weights.tolist()))
+        # The lexicon is part of the id, so editing it doesn't return results cached for the old one
+        self.model_id = "rule:" + hashlib.sha1(json.dumps(lexicon, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    def score(self, texts):
+        scores = self.scorer.scores(texts)
+        return [("positive" if s > 0 else "negative", float(s)) for s in scores]
+
+
+# VADER runs in worker processes; each worker builds its own analyzer once
+_vader = None
+
+def _init_vader():
+    global _vader
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    _vader = SentimentIntensityAnalyzer()
+
+def _vader_score(text):
+    compound = _vader.polarity_scores(text)["compound"]
+    return ("positive" if compound >= 0 else "negative", compound) # Same cut-off as vader_sentiment_analyzer
+
+
+class VaderEngine:
+    """VADER compound score, spread over a process pool for large batches.
+
+    The pool is started on the first large batch and reused by every later call, so streaming a big file doesn't
+    start new worker processes (and load VADER in each of them again) for every batch. Call close(), or use the
+    engine in a with block, to shut the workers down.
+    """
+
+    model_id = "vader"
+
+    def __init__(self, workers=None, chunksize=256, min_parallel=2_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.min_parallel = min_parallel # Smaller batches aren't worth starting the pool for
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, initializer=_init_vader)
+            return self._pool
+
+    def score(self, texts):
+        texts = list(texts)
+        if self.workers == 1 or len(texts) < self.min_parallel:
+            if _vader is None:
+                _init_vader()
+            return [_vader_score(text) for text in texts]
+        return list(self._get_pool().map(_vader_score, texts, chunksize=self.chunksize))
+
+    def close(self):
+        """Shut down the worker processes (a new pool is started if score() is called again)."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class TransformerEngine:
+    """Hugging Face sentiment-analysis pipeline, called on batches of reviews on the CPU."""
+
+    def __init__(self, model=None, batch_size=32):
+        from transformers import pipeline # Optional dependency (with torch), only needed for this engine
+        self.pipeline = pipeline("sentiment-analysis", model=model, device=-1)
+        self.batch_size = batch_size
+        self.model_id = "transformer:" + self.pipeline.model.name_or_path
+
+    def score(self, texts):
+        results = self.pipeline(list(texts), batch_size=self.batch_size, truncation=True)
+        return [("negative" if r["label"] == "NEGATIVE" else "positive", float(r["score"])) for r in results]
+
+
+ENGINES = {"rule": RuleEngine, "vader": VaderEngine, "transformer": TransformerEngine}
+
+
+class SentimentService:
+    """Runs engines over batches of reviews, only scoring texts that aren't in the cache yet."""
+
+    def __init__(self, engines=None, cache_path=CACHE_PATH):
+        self.engines = engines if engines is not None else {"rule": RuleEngine(), "vader": VaderEngine()}
+        self.cache = ResultCache(cache_path) if cache_path else None
+
+    def score(self, name, texts):
+        """DataFrame with a label and score for each text, plus (reviews, unique, cached) counts."""
+        engine = self.engines[name]
+        texts = ["" if pd.isna(text) else str(text) for text in texts]
+        unique = dict.fromkeys(texts) # Duplicate reviews are scored once
+        hashes = {text: text_hash(text) for text in unique}
+        found = self.cache.get_many(engine.model_id, hashes.values()) if self.cache else {}
+        missing = [text for text in unique if hashes[text] not in found]
+        if missing:
+            new = engine.score(missing)
+            found.update({hashes[text]: result for text, result in zip(missing, new)})
+            if self.cache:
+                self.cache.put_many(engine.model_id, [(hashes[text], label, score) for text, (label, score) in zip(missing, new)])
+        results = [found[hashes[text]] for text in texts]
+        frame = pd.DataFrame(results, columns=["label", "score"]) if results else pd.DataFrame({"label": [], "score": []})
+        return frame, (len(texts), len(unique), len(unique) - len(missing))
+
+    def compare(self, df, column="review", engines=None):
+        """Add one label column per engine to a copy of df, and return it with a throughput table."""
+        df = df.copy()
+        rows = []
+        for name in engines or list(self.engines):
+            start = time.perf_counter()
+            frame, (n, n_unique, n_cached) = self.score(name, df[column])
+            seconds = time.perf_counter() - start
+            df[ENGINE_COLUMNS.get(name, f"{name}_sent")] = frame["label"].to_numpy()
+            rows.append({"engine": name, "reviews": n, "unique": n_unique, "cached": n_cached,
+                         "seconds": seconds, "reviews_per_sec": n / seconds if seconds else float("inf")})
+        return df, pd.DataFrame(rows)
+
+    def close(self):
+        """Release the engines' resources (e.g. VADER's worker processes)."""
+        for engine in self.engines.values():
+            if hasattr(engine, "close"):
+                engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV of reviews with several sentiment engines and compare their throughput.")
+    parser.add_argument("csv", help="CSV file with one review per row")
+    parser.add_argument("--column", default="review", help="Name of the review column (default: review)")
+    parser.add_argument("--engines", nargs="+", default=["rule", "vader"], choices=list(ENGINES))
+    parser.add_argument("--batch-size", type=int, default=32, help="Transformer batch size")
+    parser.add_argument("--workers", type=int, default=None, help="VADER worker processes (default: all CPUs)")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the result cache")
+    parser.add_argument("--output", help="Write the labelled reviews to this CSV")
+    args = parser.parse_args()
+
+    engines = {}
+    for name in args.engines:
+        if name == "vader":
+            engines[name] = VaderEngine(workers=args.workers)
+        elif name == "transformer":
+            engines[name] = TransformerEngine(batch_size=args.batch_size)
+        else:
+            engines[name] = ENGINES[name]()
+    service = SentimentService(engines, cache_path=None if args.no_cache else CACHE_PATH)
+    try:
+        labelled, throughput = service.compare(pd.read_csv(args.csv), args.column)
+    finally:
+        service.close()
+    print(throughput.to_string(index=False))
+    if args.output:
+        labelled.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
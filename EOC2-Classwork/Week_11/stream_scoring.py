@@ -0,0 +1,149 @@
+# Streaming sentiment scoring for review files that don't fit in memory
+# Reviews are read from a CSV or JSONL file one record at a time, scored a batch at a time, and written straight
+# to the output file, so memory use depends on the batch size rather than on the size of the file. After every
+# batch a small checkpoint file records how far into the input (in bytes) the job got and the running tallies;
+# if the job is interrupted it picks up from there instead of starting over. The checkpoint also records which
+# input file it belongs to (path, size and modification time), so a changed or different input starts from scratch.
+import csv
+import io
+import json
+import os
+from dataclasses import asdict, dataclass
+
+BATCH_SIZE = 10_000 # Reviews scored and written per step
+
+
+@dataclass
+class Progress:
+    """Where a streaming job is: bytes of input consumed, reviews scored and the label tallies so far."""
+
+    offset: int = 0 # Bytes of the input file fully processed
+    output_bytes: int = 0 # Size of the output file after the last completed batch
+    rows: int = 0
+    positive: int = 0
+    negative: int = 0
+    total_bytes: int = 0 # Size of the input file
+    input_path: str = "" # Absolute path of the input file
+    input_mtime_ns: int = 0 # Modification time of the input file
+
+    @property
+    def fraction(self):
+        return self.offset / self.total_bytes if self.total_bytes else 1.0
+
+
+class _LineReader:
+    # Feeds decoded lines to csv.reader while keeping track of the byte position, so after each record we know
+    # exactly where the next one starts (csv.reader only pulls the lines it needs, even for quoted newlines)
+    def __init__(self, handle):
+        self.handle = handle
+        self.pos = handle.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.handle.readline()
+        if not line:
+            raise StopIteration
+        self.pos = self.handle.tell()
+        return line.decode("utf-8")
+
+
+def _is_jsonl(path):
+    return path.lower().endswith((".jsonl", ".ndjson"))
+
+
+def read_records(path, start=0):
+    """Yield (end offset, record) for every record after byte offset start. CSV records are dicts of the columns."""
+    with open(path, "rb") as handle:
+        if _is_jsonl(path):
+            handle.seek(start)
+            for line in iter(handle.readline, b""):
+                if line.strip():
+                    yield handle.tell(), json.loads(line)
+            return
+        lines = _LineReader(handle)
+        header = next(csv.reader(lines)) # The header is always read from the top of the file
+        if start > lines.pos:
+            handle.seek(start)
+            lines.pos = start
+        for row in csv.reader(lines):
+            if row:
+                yield lines.pos, dict(zip(header, row))
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return Progress(**json.load(handle))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_checkpoint(path, progress):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(asdict(progress), handle)
+    os.replace(tmp_path, path) # Never leaves a half-written checkpoint behind
+
+
+def _batches(records, batch_size):
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_score(input_path, output_path, label_batch, column="review", label_column="sentiment",
+                 batch_size=BATCH_SIZE, checkpoint_path=None, resume=True):
+    """Score every review in input_path and write the records plus a label column to output_path.
+
+    label_batch takes a list of review texts and returns a "positive"/"negative" label for each. This is a
+    generator: it yields the Progress after every batch, so a caller can show live tallies. With resume, a job
+    that was interrupted continues from the checkpoint (default: output_path + ".checkpoint").
+    """
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+    progress = load_checkpoint(checkpoint_path) if resume else None
+    stat = os.stat(input_path)
+    source = {"input_path": os.path.abspath(input_path), "total_bytes": stat.st_size, "input_mtime_ns": stat.st_mtime_ns}
+    # The byte offset only means something for the exact file it was taken from, so a checkpoint for another file,
+    # or for this file before it was edited, is ignored (checkpoints from before these fields existed never match)
+    if (progress is None or not os.path.exists(output_path)
+            or any(getattr(progress, name) != value for name, value in source.items())):
+        progress = Progress(**source)
+
+    jsonl = _is_jsonl(output_path)
+    with open(output_path, "r+b" if progress.output_bytes else "wb") as out:
+        # Anything written after the last checkpoint (a batch that didn't finish) is dropped and scored again
+        out.truncate(progress.output_bytes)
+        out.seek(progress.output_bytes)
+        text_out = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+        writer = None
+        for batch in _batches(read_records(input_path, progress.offset), batch_size):
+            records = [record for _, record in batch]
+            labels = label_batch([str(record.get(column) or "") for record in records])
+            for record, label in zip(records, labels):
+                record[label_column] = label
+            if jsonl:
+                text_out.writelines(json.dumps(record) + "\n" for record in records)
+            else:
+                if writer is None:
+                    writer = csv.DictWriter(text_out, fieldnames=list(records[0]), extrasaction="ignore")
+                    if progress.output_bytes == 0:
+                        writer.writeheader()
+                writer.writerows(records)
+            text_out.flush()
+
+            n_positive = sum(label == "positive" for label in labels)
+            progress.offset = batch[-1][0]
+            progress.output_bytes = out.tell()
+            progress.rows += len(records)
+            progress.positive += n_positive
+            progress.negative += len(records) - n_positive
+            save_checkpoint(checkpoint_path, progress)
+            yield progress
+        text_out.detach()
@@ -1,17 +1,72 @@
+import io
+import os
+
 import streamlit as st
+from lexicon_scorer import LexiconScorer, to_labels
+from sentiment_service import VaderEngine
+from stream_scoring import BATCH_SIZE, stream_score
 
 # Sentiment functions
-def rule_based_sentiment(text):
-    lexicon = {
-        "good": 1, "great": 2, "excellent": 3,
-        "bad": -2, "poor": -3, "terrible": -5
-    }
-    score = sum([lexicon.get(word, 0) for word in text.lower().split()])
-    return "positive" if score > 0 else "negative"
+# The lexicon is compiled once into a LexiconScorer (see lexicon_scorer.py) instead of being rebuilt on every call
+@st.cache_resource
+def get_scorer(lexicon_bytes=None):
+    if lexicon_bytes is None:
+        return LexiconScorer()
+    return LexiconScorer.from_csv(io.BytesIO(lexicon_bytes))
+
+def rule_based_sentiment(text, scorer=None):
+    scorer = scorer or get_scorer()
+    return to_labels(scorer.scores([text]))[0]
+
+# Optional custom lexicon: a CSV with "word" and "weight" columns
+lexicon_file = st.sidebar.file_uploader("Custom lexicon (CSV with word and weight columns)", type=["csv"])
+scorer = get_scorer(lexicon_file.getvalue() if lexicon_file else None)
 
 # Streamlit interface
 st.title("🎯 Sentiment Analyzer")
 text = st.text_area("Enter your review:")
 
-result = rule_based_sentiment(text)
-st.write(f"🧠 Sentiment: **{result.upper()}**")
\ No newline at end of file
+result = rule_based_sentiment(text, scorer)
+st.write(f"🧠 Sentiment: **{result.upper()}**")
+
+# Streaming mode: score a (possibly huge) CSV/JSONL file of reviews on the server a batch at a time
+st.header("📂 Score a review file")
+st.write("Reads the file in batches and writes each review with its label to an output file, so any file size works. If a run is interrupted, it continues from where it stopped.")
+input_path = st.text_input("Path to a CSV or JSONL file of reviews on the server").strip()
+column = st.text_input("Review column / field", value="review")
+engine = st.radio("Analyzer", ["Rule-based", "VADER"], horizontal=True)
+if input_path:
+    stem, ext = os.path.splitext(input_path)
+    output_path = st.text_input("Output file", value=f"{stem}_scored{ext}").strip()
+    resume = st.checkbox("Resume from the last checkpoint", value=True)
+    batch_size = st.number_input("Reviews per batch", min_value=100, max_value=1_000_000, value=BATCH_SIZE, step=1_000)
+
+    if st.button("Start scoring"):
+        if not os.path.isfile(input_path):
+            st.error(f"File not found: {input_path}")
+            st.stop()
+        # VADER keeps one pool of worker processes for the whole file, shut down once the job ends
+        vader = VaderEngine() if engine == "VADER" else None
+        if vader is not None:
+            label_batch = lambda texts: [label for label, _ in vader.score(texts)]
+        else:
+            label_batch = lambda texts: to_labels(scorer.scores(texts)).tolist()
+
+        # Running tallies, updated after every batch
+        progress_bar = st.progress(0.0)
+        col1, col2, col3 = st.columns(3)
+        scored_metric, positive_metric, negative_metric = col1.empty(), col2.empty(), col3.empty()
+        progress = None
+        try:
+            for progress in stream_score(input_path, output_path, label_batch, column=column, batch_size=int(batch_size), resume=resume):
+                progress_bar.progress(min(progress.fraction, 1.0), text=f"{progress.fraction:.0%} of the file")
+                scored_metric.metric("Reviews scored", f"{progress.rows:,}")
+                positive_metric.metric("Positive", f"{progress.positive:,}")
+                negative_metric.metric("Negative", f"{progress.negative:,}")
+        finally:
+            if vader is not None:
+                vader.close()
+        if progress is None:
+            st.info("Nothing left to score - the output is already complete. Untick \"Resume\" to score the file again.")
+        else:
+            st.success(f"Done! Labelled reviews written to {output_path}")
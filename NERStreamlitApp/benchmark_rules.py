@@ -0,0 +1,57 @@
+# Benchmark: full spaCy pipeline vs. the rules-only (PhraseMatcher) fast path on the same corpus
+# Run with, for example: python benchmark_rules.py --patterns 20000 transcript1.txt transcript2.txt
+# Without any files, a synthetic corpus is generated so the two modes can still be compared.
+import argparse
+import random
+import time
+
+from corpus import annotate_corpus
+from pipeline import PipelineManager
+
+WORDS = ["the", "meeting", "was", "held", "in", "with", "and", "a", "report", "about", "new", "market", "team", "said"]
+
+
+def synthetic_corpus(n_docs, words_per_doc, names, seed=0):
+    # Random filler text with one of the pattern phrases dropped in every ~20 words
+    rng = random.Random(seed)
+    documents = []
+    for i in range(n_docs):
+        words = [rng.choice(names) if rng.random() < 0.05 else rng.choice(WORDS) for _ in range(words_per_doc)]
+        documents.append((f"doc{i}", " ".join(words) + "."))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the full NER pipeline with the rules-only mode.")
+    parser.add_argument("files", nargs="*", help="Text files to use as the corpus (default: synthetic corpus)")
+    parser.add_argument("--model", default="en_core_web_sm")
+    parser.add_argument("--patterns", type=int, default=10_000, help="Number of LABEL:PATTERN rules to compile")
+    parser.add_argument("--docs", type=int, default=200, help="Synthetic documents to generate")
+    parser.add_argument("--words", type=int, default=500, help="Words per synthetic document")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    names = [f"Entity{i} Corp" for i in range(args.patterns)]
+    patterns = [{"label": "ORG_RULE", "pattern": name} for name in names]
+    if args.files:
+        documents = [(path, open(path, encoding="utf-8").read()) for path in args.files]
+    else:
+        documents = synthetic_corpus(args.docs, args.words, names)
+
+    manager = PipelineManager(args.model)
+    print(f"{len(documents)} documents, {sum(len(text) for _, text in documents):,} characters, {len(patterns):,} patterns")
+    print(f"{'mode':<12}{'compile s':>12}{'run s':>10}{'docs/sec':>12}{'tokens/sec':>14}{'entities':>10}")
+    for label, rules_only in [("full", False), ("rules-only", True)]:
+        started = time.perf_counter()
+        manager.get_ruler(patterns, rules_only=rules_only) # Compile once, as the app does on the first rerun
+        compile_seconds = time.perf_counter() - started
+        results, report = annotate_corpus(manager, documents, patterns, batch_size=args.batch_size,
+                                          n_process=args.n_process, rules_only=rules_only)
+        n_ents = sum(len(doc.ents) for doc in results)
+        print(f"{label:<12}{compile_seconds:>12.2f}{report.seconds:>10.2f}{report.docs_per_sec:>12.1f}"
+              f"{report.tokens_per_sec:>14,.0f}{n_ents:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Corpus mode for the NER app
+# Long uploads (and several uploaded files) are split into paragraph- or sentence-aligned chunks that are
+# streamed through nlp.pipe, so no single nlp() call has to hold a multi-megabyte document in memory.
+# Entity offsets found in each chunk are shifted back into the coordinates of the original document.
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pipeline import pattern_key
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n") # One or more blank lines
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+") # Whitespace following sentence-ending punctuation
+
+
+@dataclass
+class AnnotatedDocument:
+    """One input document plus its entities as (start_char, end_char, label) in document coordinates."""
+    name: str
+    text: str
+    ents: list = field(default_factory=list)
+
+
+@dataclass
+class ThroughputReport:
+    """How much text a corpus run pushed through the pipeline and how long it took."""
+    documents: int = 0
+    chunks: int = 0
+    cached_chunks: int = 0 # Chunks answered from the AnnotationCache without touching spaCy
+    tokens: int = 0
+    characters: int = 0
+    seconds: float = 0.0
+
+    @property
+    def docs_per_sec(self):
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def chunks_per_sec(self):
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_sec(self):
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+
+def split_units(text, align="paragraph"):
+    """Yield (start, end) offsets of the paragraphs or sentences in text, including their trailing whitespace.
+
+    align="characters" treats the whole text as one unit, so chunk_text falls back to plain character windows.
+    """
+    if align == "characters":
+        if text:
+            yield 0, len(text)
+        return
+    breaker = SENTENCE_BREAK if align == "sentence" else PARAGRAPH_BREAK
+    start = 0
+    for match in breaker.finditer(text):
+        yield start, match.end()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def chunk_text(text, max_chars=100_000, align="paragraph", pack=True):
+    """Yield (offset, chunk) pairs that pack whole paragraphs/sentences into chunks of at most max_chars.
+
+    With pack=False every paragraph/sentence becomes its own chunk, which is what the AnnotationCache needs so
+    that an edit only invalidates the unit it touched.
+    """
+    chunk_start = chunk_end = 0
+    for start, end in split_units(text, align):
+        # Flush before this unit when packing is off or when adding it would overflow the chunk
+        if (not pack or end - chunk_start > max_chars) and chunk_end > chunk_start:
+            yield chunk_start, text[chunk_start:chunk_end]
+            chunk_start = chunk_end
+        # A single paragraph/sentence longer than max_chars is cut at the last space before the limit
+        while end - chunk_start > max_chars:
+            cut = text.rfind(" ", chunk_start, chunk_start + max_chars)
+            cut = cut + 1 if cut > chunk_start else chunk_start + max_chars
+            yield chunk_start, text[chunk_start:cut]
+            chunk_start = cut
+        chunk_end = end
+    if chunk_end > chunk_start:
+        yield chunk_start, text[chunk_start:chunk_end]
+
+
+class AnnotationCache:
+    """Process-wide LRU of chunk entities keyed by the chunk's content hash plus the active pattern-set hash."""
+
+    def __init__(self, max_entries=50_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> tuple of (start_char, end_char, label) relative to the chunk
+        self._lock = threading.Lock() # Shared by every Streamlit session in the process
+
+    @staticmethod
+    def key(chunk, patterns_hash):
+        return hashlib.sha1(chunk.encode("utf-8")).hexdigest() + ":" + patterns_hash
+
+    def get(self, key):
+        with self._lock:
+            ents = self._entries.get(key)
+            if ents is not None:
+                self._entries.move_to_end(key)
+            return ents
+
+    def put(self, key, ents):
+        with self._lock:
+            self._entries[key] = tuple(ents)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def annotate_corpus(manager, documents, patterns, batch_size=32, n_process=1, max_chars=100_000, align="paragraph", cache=None,
+                    rules_only=False):
+    """Run (name, text) documents through the pipeline in chunks; return AnnotatedDocuments and a ThroughputReport.
+
+    When an AnnotationCache is passed, each paragraph/sentence is its own chunk and only the chunks that are not
+    already cached for this pattern set go through spaCy. rules_only skips the statistical model entirely and
+    only matches the custom patterns.
+    """
+    results = [AnnotatedDocument(name, text) for name, text in documents]
+    report = ThroughputReport(documents=len(results))
+    patterns_hash = pattern_key(patterns) + (":rules" if rules_only else "") # The two modes find different entities
+
+    def chunks():
+        # Context travels with each chunk so its entities can be mapped back to the right document/offset
+        for index, doc in enumerate(results):
+            for offset, chunk in chunk_text(doc.text, max_chars, align, pack=cache is None):
+                report.chunks += 1
+                key = None
+                if cache is not None:
+                    key = cache.key(chunk, patterns_hash)
+                    ents = cache.get(key)
+                    if ents is not None: # Unchanged chunk - re-offset the cached spans instead of re-parsing
+                        report.cached_chunks += 1
+                        doc.ents.extend((offset + start, offset + end, label) for start, end, label in ents)
+                        continue
+                report.characters += len(chunk)
+                yield chunk, (index, offset, key)
+
+    started = time.perf_counter()
+    with manager.activate(patterns, rules_only) as nlp:
+        nlp.max_length = max(nlp.max_length, max_chars) # Chunks never exceed max_chars
+        for doc, (index, offset, key) in nlp.pipe(chunks(), as_tuples=True, batch_size=batch_size, n_process=n_process):
+            report.tokens += len(doc)
+            ents = [(ent.start_char, ent.end_char, ent.label_) for ent in doc.ents]
+            if key is not None:
+                cache.put(key, ents)
+            results[index].ents.extend((offset + start, offset + end, label) for start, end, label in ents)
+    for doc in results: # Cached and freshly parsed chunks arrive in different orders
+        doc.ents.sort()
+    report.seconds = time.perf_counter() - started
+    return results, report
@@ -1,21 +1,53 @@
 # Load dependencies
 import streamlit as st
 import pandas as pd
-import spacy 
-from spacy import displacy
-nlp = spacy.load("en_core_web_sm") # Loading in the English language model
+import hashlib
+import os
+import sys
+from pipeline import PipelineManager, pattern_key
+from corpus import AnnotationCache, annotate_corpus
+from render import paginate, render_page
+from stats import EntityStats
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")) # Modules shared with the other apps
+from instrumentation import show_panel, span, start_rerun # Per-stage timings (only when APP_PROFILE is set)
+
+# Times each stage of this rerun if profiling is switched on (see instrumentation.py)
+start_rerun("NER App")
+
+# Loading in the English language model once per process instead of on every rerun
+@st.cache_resource
+def load_pipeline():
+    return PipelineManager("en_core_web_sm")
+
+# Paragraph-level annotations shared by every session, so unchanged paragraphs are never parsed twice
+@st.cache_resource
+def load_annotation_cache():
+    return AnnotationCache()
+
+with span("load spaCy model"):
+    manager = load_pipeline()
+annotation_cache = load_annotation_cache()
 
 # Title and description of app
 st.title("Custom Named Entity Recognition App")
 st.write("This app allows the user to upload or paste in text to")
 
 # Text input/upload
-file_upload = st.file_uploader("Upload a text file:", type=["txt"])
-if file_upload: # If file is uploaded, read into and decode its context so that it is contained in the text variable
-    text = file_upload.read().decode("utf-8")
+file_uploads = st.file_uploader("Upload one or more text files:", type=["txt"], accept_multiple_files=True)
+if file_uploads: # If files are uploaded, read and decode each one so that every file becomes its own document
+    with span("read uploads"):
+        documents = [(file_upload.name, file_upload.read().decode("utf-8")) for file_upload in file_uploads]
 else: # If file is not uploaded, simply take text from text input box into text variable
     text = st.text_area("Alternatively, paste your text here:","Example text: Jeff is from Charlotte, NC. He works at Home Depot.")
-nlp.max_length = len(text) # Adjusting max length for the NLP to the length of the text
+    documents = [("Pasted text", text)]
+
+# Corpus settings - large texts are split into chunks and batched through spaCy instead of one giant nlp() call
+with st.expander("Corpus processing settings"):
+    align = st.radio("Split long texts on", ["paragraph", "sentence"], horizontal=True)
+    max_chars = st.number_input("Maximum characters per chunk", min_value=1_000, max_value=1_000_000, value=100_000, step=10_000)
+    batch_size = st.number_input("Batch size (chunks per nlp.pipe batch)", min_value=1, max_value=1_000, value=32)
+    n_process = st.number_input("Worker processes", min_value=1, max_value=16, value=1)
+    incremental = st.checkbox("Only re-annotate edited paragraphs/sentences", value=True)
 
 # Formatting instructions for adding in custom patterns to EntityRuler
 st.subheader("Add your custom patterns:")
@@ -44,52 +76,75 @@ if patterns_input:
 st.subheader("Your custom patterns:")
 st.write(patterns)
 
-# Adding in the EntityRuler
-# Checking if the "ner" pipe exists, and adding in the EntityRuler before it if so
-if "ner" in nlp.pipe_names:
-    # Adds the patterns if the EntityRuler exists
-    try:
-        ruler = nlp.get_pipe("entity_ruler")
-    # If it doesn't exist, add it in before "ner"
-    except Exception:
-        ruler = nlp.add_pipe("entity_ruler", before="ner")
-    ruler.add_patterns(patterns)
-else:
-    # Add both the EntityRuler and the NER component if "ner" does not exist
-    ruler = nlp.add_pipe("entity_ruler")
-    ruler.add_patterns(patterns)
-    ner = nlp.add_pipe("ner")
+# Rules-only mode skips the tagger, parser and statistical NER, and only matches the custom patterns (case-insensitive)
+mode = st.radio("Recognition mode", ["Full pipeline (spaCy entities + custom patterns)", "Custom patterns only (faster)"])
+rules_only = mode.startswith("Custom patterns only")
+if rules_only and not patterns:
+    st.write("Rules-only mode needs at least one custom pattern to find any entities.")
 
 # Processing the text through the NLP
-doc = nlp(text)
+# The manager swaps in an EntityRuler compiled for exactly this set of patterns (reused across reruns),
+# so the patterns are never re-added to a ruler that keeps growing
+# The result is kept in session state, so reruns that only change the display (like turning a page) reuse the spans
+content_hash = hashlib.sha1("\0".join(text for _, text in documents).encode("utf-8")).hexdigest()
+run_key = (content_hash, pattern_key(patterns), rules_only, align, int(max_chars))
+if st.session_state.get("run_key") != run_key:
+    with span("spaCy (annotate corpus)"):
+        annotated, report = annotate_corpus(manager, documents, patterns, batch_size=int(batch_size), n_process=int(n_process), max_chars=int(max_chars), align=align,
+                                            cache=annotation_cache if incremental else None, rules_only=rules_only)
+    with span("entity counts"):
+        entity_stats = EntityStats().update(annotated)
+    st.session_state["annotations"] = (annotated, report, entity_stats)
+    st.session_state["run_key"] = run_key
+annotated, report, entity_stats = st.session_state["annotations"]
+
+# Throughput report for the run
+st.caption(f"Processed {report.documents} document(s) in {report.chunks} chunk(s) ({report.cached_chunks} reused from cache), {report.tokens:,} new tokens in {report.seconds:.2f}s "
+           f"({report.docs_per_sec:.1f} docs/sec, {report.tokens_per_sec:,.0f} tokens/sec)")
 
 # Display recognized entities using displaCy
 st.subheader("Your labeled text:")
-# Displacy renders as html, so have to use st.components.v1.html to display it properly in streamlit
-html = displacy.render(doc, style="ent", page=True) 
-st.components.v1.html(html, scrolling=True) 
+# Only one page is rendered at a time, so the HTML sent to the browser stays the same size however long the text is
+with st.expander("Page settings"):
+    page_align = st.radio("Split pages on", ["sentence", "paragraph", "characters"], horizontal=True)
+    page_chars = st.number_input("Characters per page", min_value=1_000, max_value=200_000, value=20_000, step=5_000)
+    max_ents = st.number_input("Maximum highlighted entities per page", min_value=10, max_value=10_000, value=500, step=100)
+with span("paginate"):
+    pages = paginate(annotated, int(page_chars), page_align)
+if pages:
+    page_number = st.number_input(f"Page (of {len(pages)})", min_value=1, max_value=len(pages), value=1) if len(pages) > 1 else 1
+    doc_index, page_start, page_end = pages[page_number - 1]
+    doc = annotated[doc_index]
+    # The entities were collected per chunk, so displaCy renders them in manual mode from the merged character offsets
+    with span("displaCy render"):
+        html, n_shown, n_page_ents = render_page(doc, page_start, page_end, int(max_ents), title=doc.name if len(annotated) > 1 else None)
+        if n_shown < n_page_ents:
+            st.caption(f"Showing the first {n_shown} of {n_page_ents} entities on this page.")
+        # Displacy renders as html, so have to use st.components.v1.html to display it properly in streamlit
+        st.components.v1.html(html, scrolling=True) 
+else:
+    st.write("No text to display.")
 
 # Additional entity analysis table providing the top 10 most frequent patterns and their frequency
 st.subheader("Analyzing the entity data:")
 
-# New list of data that extracts the text and label from doc.ents, which stores the processed entity data
-entities_data = []
-for ent in doc.ents:
-    entities_data.append({
-        'text': ent.text,
-        'label': ent.label_
-    })
-
-# Create dataframe with this data
-ent_df = pd.DataFrame(entities_data)
-
-# If that dataframe has data in it, prints a table of the top 10 combinations
-if not ent_df.empty:
-    st.write("Top 10 Text and Label Combinations:")
-    st.write(ent_df[['text','label']].value_counts()[:10])
-else:
-    st.write("No entities found to analyze.")
-
-
-
-
+# The entity counts were aggregated straight from the entity offsets when the text was processed
+top_n = st.number_input("Number of top combinations to show", min_value=1, max_value=100, value=10)
+label_choice = st.selectbox("Label", ["All labels"] + sorted(entity_stats.labels))
+
+# If any entities were found, prints a table of the top N combinations plus the totals for every label
+with span("entity tables"):
+    if len(entity_stats):
+        st.write(f"Top {top_n} Text and Label Combinations:")
+        top_pairs = entity_stats.top(int(top_n), None if label_choice == "All labels" else label_choice)
+        st.dataframe(pd.DataFrame([{"text": text, "label": label, "count": count} for (text, label), count in top_pairs]), hide_index=True)
+        st.write("Entities per label:")
+        st.dataframe(pd.DataFrame(entity_stats.labels.most_common(), columns=["label", "count"]), hide_index=True)
+        with st.expander(f"Top {top_n} for every label"):
+            for label, label_pairs in entity_stats.top_per_label(int(top_n)).items():
+                st.write(f"**{label}**")
+                st.dataframe(pd.DataFrame([{"text": text, "count": count} for (text, _), count in label_pairs]), hide_index=True)
+    else:
+        st.write("No entities found to analyze.")
+
+show_panel()
@@ -0,0 +1,123 @@
+# Shared spaCy pipeline manager for the NER app
+# Streamlit reruns the whole script on every widget change, so anything expensive (loading the
+# language model, compiling the EntityRuler patterns) lives here and is built once per process.
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+import spacy
+from spacy.language import Language
+from spacy.matcher import PhraseMatcher
+from spacy.pipeline import EntityRuler
+from spacy.util import filter_spans
+
+
+class RulerSlot:
+    """Pipeline component that hands each doc to whichever compiled EntityRuler is active."""
+
+    def __init__(self):
+        self.ruler = None
+
+    def __call__(self, doc):
+        if self.ruler is None: # No custom patterns, so the doc passes straight through to "ner"
+            return doc
+        return self.ruler(doc)
+
+
+class PhraseRuler:
+    """Rules-only stand-in for the EntityRuler: a case-insensitive PhraseMatcher that writes doc.ents directly."""
+
+    def __init__(self, nlp, patterns):
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        patterns_by_label = defaultdict(list)
+        for p in normalize_patterns(patterns):
+            patterns_by_label[p["label"]].append(p["pattern"])
+        # Patterns only need to be tokenized, which is cheap enough to compile tens of thousands at once
+        for label, phrases in patterns_by_label.items():
+            self.matcher.add(label, list(nlp.tokenizer.pipe(phrases)))
+
+    def __call__(self, doc):
+        # Overlapping matches are resolved the same way the EntityRuler does it: longest span wins
+        doc.ents = filter_spans(self.matcher(doc, as_spans=True))
+        return doc
+
+
+@Language.factory("ruler_slot")
+def create_ruler_slot(nlp, name):
+    return RulerSlot()
+
+
+def normalize_patterns(patterns):
+    """Return the patterns stripped, de-duplicated and sorted so equal pattern sets compare equal."""
+    cleaned = {(p["label"].strip(), p["pattern"].strip()) for p in patterns}
+    return [{"label": label, "pattern": pattern} for label, pattern in sorted(cleaned) if label and pattern]
+
+
+def pattern_key(patterns):
+    """Hash of the normalized pattern list, used as the cache key for compiled rulers."""
+    payload = json.dumps(normalize_patterns(patterns), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class PipelineManager:
+    """Holds one loaded spaCy model plus an LRU cache of compiled EntityRulers keyed by pattern set.
+
+    Next to the full model there is a tokenizer-only "rules-only" pipeline for runs that only need the
+    user's LABEL:PATTERN rules; it shares the model's vocab and tokenizer and uses PhraseRulers instead.
+    """
+
+    def __init__(self, model="en_core_web_sm", max_rulers=8):
+        self.nlp = spacy.load(model)
+        self.max_rulers = max_rulers
+        # The slot sits exactly where the EntityRuler used to be added: right before "ner" so that custom
+        # patterns take priority over the statistical model
+        if "ner" in self.nlp.pipe_names:
+            self.slot = self.nlp.add_pipe("ruler_slot", before="ner")
+        else:
+            self.slot = self.nlp.add_pipe("ruler_slot")
+        self.rules_nlp = spacy.blank(self.nlp.lang, vocab=self.nlp.vocab)
+        self.rules_nlp.tokenizer = self.nlp.tokenizer # Same tokenization as the full model
+        self.rules_slot = self.rules_nlp.add_pipe("ruler_slot")
+        self._rulers = OrderedDict() # (mode, pattern key) -> compiled EntityRuler/PhraseRuler, oldest first
+        # Streamlit serves every session from threads in the same process, so swapping the active ruler
+        # and running the pipeline have to happen together
+        self._lock = threading.RLock()
+
+    def get_ruler(self, patterns, rules_only=False):
+        """Return the compiled EntityRuler (or PhraseRuler) for these patterns, building it only on a cache miss."""
+        key = ("rules" if rules_only else "full", pattern_key(patterns))
+        with self._lock:
+            ruler = self._rulers.get(key)
+            if ruler is not None:
+                self._rulers.move_to_end(key) # Mark as most recently used
+                return ruler
+            if rules_only:
+                ruler = PhraseRuler(self.nlp, patterns)
+            else:
+                ruler = EntityRuler(self.nlp, name="entity_ruler")
+                # Phrase patterns only need the tokenizer, so skip the tagger/parser/ner while compiling them
+                with self.nlp.select_pipes(enable=[]):
+                    ruler.add_patterns(normalize_patterns(patterns))
+            self._rulers[key] = ruler
+            while len(self._rulers) > self.max_rulers: # Evict the least recently used pattern set
+                self._rulers.popitem(last=False)
+            return ruler
+
+    @contextmanager
+    def activate(self, patterns, rules_only=False):
+        """Swap the ruler for these patterns into the pipeline and yield the ready-to-use nlp object."""
+        with self._lock:
+            if rules_only:
+                self.rules_slot.ruler = self.get_ruler(patterns, rules_only=True)
+                yield self.rules_nlp
+            else:
+                self.slot.ruler = self.get_ruler(patterns) if patterns else None
+                yield self.nlp
+
+    def annotate(self, text, patterns, rules_only=False):
+        """Run the full (or rules-only) pipeline over one text with the given custom patterns active."""
+        with self.activate(patterns, rules_only) as nlp:
+            nlp.max_length = max(nlp.max_length, len(text)) # Adjusting max length for the NLP to the length of the text
+            return nlp(text)
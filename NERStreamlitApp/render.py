@@ -0,0 +1,40 @@
+# Paginated displaCy rendering for the NER app
+# Rendering a whole annotated document at once produces one huge HTML string, so the text is cut into pages
+# (sentence-, paragraph- or character-window-aligned) and only the page being viewed is turned into HTML.
+# Everything is rendered from the (start_char, end_char, label) spans, never by running the pipeline again.
+from bisect import bisect_left
+
+from spacy import displacy
+
+from corpus import chunk_text
+
+
+def paginate(documents, page_chars=20_000, align="sentence"):
+    """Return (document index, start, end) for every page across the annotated documents."""
+    pages = []
+    for index, doc in enumerate(documents):
+        for offset, chunk in chunk_text(doc.text, page_chars, align):
+            pages.append((index, offset, offset + len(chunk)))
+    return pages
+
+
+def page_entities(ents, start, end):
+    """Entities overlapping [start, end), shifted to page coordinates and clipped to the page edges."""
+    # ents are sorted by start offset, so jump straight to the first entity that could be on the page
+    i = bisect_left(ents, (start,))
+    if i > 0 and ents[i - 1][1] > start: # An entity that begins on the previous page and runs into this one
+        i -= 1
+    page_ents = []
+    while i < len(ents) and ents[i][0] < end:
+        ent_start, ent_end, label = ents[i]
+        page_ents.append({"start": max(ent_start, start) - start, "end": min(ent_end, end) - start, "label": label})
+        i += 1
+    return page_ents
+
+
+def render_page(doc, start, end, max_ents=500, title=None):
+    """displaCy HTML for one page of an AnnotatedDocument; returns (html, entities shown, entities on the page)."""
+    page_ents = page_entities(doc.ents, start, end)
+    shown = page_ents[:max_ents] # Cap the number of highlighted entities so a dense page stays light
+    html = displacy.render({"text": doc.text[start:end], "ents": shown, "title": title}, style="ent", page=True, manual=True)
+    return html, len(shown), len(page_ents)
@@ -0,0 +1,59 @@
+# Streaming entity statistics for the NER app
+# Entity counts are folded straight into Counters as spans arrive, instead of building a list of dicts and a
+# full DataFrame only to keep the top 10. Counters from different chunks, documents or worker processes can be
+# merged with +=, so corpus-scale runs only ever hold one count per distinct (text, label) pair.
+from collections import Counter
+
+
+class EntityStats:
+    """Counts of (entity text, label) pairs plus running totals per label."""
+
+    def __init__(self):
+        self.pairs = Counter() # (text, label) -> number of occurrences
+        self.labels = Counter() # label -> number of entities with that label
+
+    def add(self, text, label, count=1):
+        self.pairs[(text, label)] += count
+        self.labels[label] += count
+
+    def add_spans(self, text, ents):
+        """Count (start_char, end_char, label) spans over text, e.g. an AnnotatedDocument's ents."""
+        for start, end, label in ents:
+            self.add(text[start:end], label)
+        return self
+
+    def add_doc(self, doc):
+        """Count the entities of a spaCy Doc or an AnnotatedDocument."""
+        if hasattr(doc, "name"): # AnnotatedDocument from corpus.py
+            return self.add_spans(doc.text, doc.ents)
+        for ent in doc.ents:
+            self.add(ent.text, ent.label_)
+        return self
+
+    def update(self, docs):
+        """Consume any iterable of docs (including a lazy nlp.pipe generator) one doc at a time."""
+        for doc in docs:
+            self.add_doc(doc)
+        return self
+
+    def __iadd__(self, other):
+        # Merging results computed for other chunks or in other processes
+        self.pairs.update(other.pairs)
+        self.labels.update(other.labels)
+        return self
+
+    def __len__(self):
+        return sum(self.labels.values())
+
+    def top(self, n=10, label=None):
+        """The n most frequent ((text, label), count) pairs, optionally restricted to one label."""
+        if label is None:
+            return self.pairs.most_common(n)
+        return Counter({pair: count for pair, count in self.pairs.items() if pair[1] == label}).most_common(n)
+
+    def top_per_label(self, n=10):
+        """{label: top n ((text, label), count) pairs} for every label seen, most frequent label first."""
+        by_label = {}
+        for pair, count in self.pairs.items(): # One pass over the pairs, grouped by label
+            by_label.setdefault(pair[1], Counter())[pair] = count
+        return {label: by_label[label].most_common(n) for label, _ in self.labels.most_common()}
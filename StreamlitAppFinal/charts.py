@@ -0,0 +1,110 @@
+# Shared chart rendering for the Country Comparison App
+# Every line and bar chart (the single-indicator view and each panel of the dashboard) is drawn by the functions
+# below. There are two backends: matplotlib, turned into PNG bytes so the app can cache finished images, and
+# Vega-Lite (through Altair), which only sends a small JSON spec to the browser and skips rasterising entirely.
+# Long series are thinned out with largest-triangle-three-buckets (LTTB) before either backend draws them.
+import io
+
+import altair as alt
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 500 # Points per line before LTTB downsampling kicks in
+
+# Axis scaling: the largest value decides whether the axis is shown in millions, billions or trillions
+SCALE_THRESHOLDS = np.array([1_000_000, 1_000_000_000, 1_000_000_000_000])
+SCALES = [(1, "Value"), (1_000_000, "Value (Millions)"), (1_000_000_000, "Value (Billions)"), (1_000_000_000_000, "Value (Trillions)")]
+
+
+def choose_scale(values):
+    """(scale, y-axis label) for an array of values, found in one vectorised pass (NaN is ignored)."""
+    values = np.asarray(values, dtype="float64")
+    if values.size == 0 or np.isnan(values).all():
+        return SCALES[0]
+    # side="right" so that exactly 1 trillion still counts as trillions
+    return SCALES[int(np.searchsorted(SCALE_THRESHOLDS, np.nanmax(values), side="right"))]
+
+
+def lttb(x, y, n_out=MAX_POINTS):
+    """Indices of n_out points that keep the visual shape of the line (x, y); all indices if it's short enough."""
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    # The first and last points are always kept; the points in between are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0 # The point picked from the previous bucket
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        # Keep the point that makes the largest triangle with the previous pick and the next bucket's average
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+def present_points(years, values, max_points=MAX_POINTS):
+    """(years, values) without the missing years, downsampled with LTTB if the line is long."""
+    present = ~np.isnan(values) # Skipping the years that country has no data for
+    x, y = years[present].astype("float64"), values[present]
+    keep = lttb(x, y, max_points)
+    return years[present][keep], y[keep]
+
+
+def to_png(fig):
+    """Render a figure to PNG bytes and close it, so figures don't pile up in pyplot."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def line_chart_png(title, years, values_by_country, scale, y_label, figsize=(6.4, 4.8)):
+    """Line chart with one line per country; values hold NaN for years without data."""
+    fig, ax = plt.subplots(figsize=figsize)
+    for country, values in values_by_country.items(): # Plotting a line for each selected country
+        x, y = present_points(years, values)
+        ax.plot(x, y / scale, marker="o", label=country)
+    ax.set_title(title)
+    ax.set_xlabel("Year")
+    ax.set_ylabel(y_label)
+    ax.legend()
+    ax.grid(True)
+    return to_png(fig)
+
+
+def bar_chart_png(title, countries, values, scale, y_label, figsize=(6.4, 4.8)):
+    """Bar chart with the value printed above each bar."""
+    fig, ax = plt.subplots(figsize=figsize)
+    bars = ax.bar(countries, np.asarray(values) / scale, color="green") # defining "bars" so that I can add value labels
+    ax.set_ylabel(y_label)
+    ax.set_title(title)
+    ax.bar_label(bars, fmt="%.2f", label_type="edge")
+    return to_png(fig)
+
+
+def line_chart_spec(title, years, values_by_country, scale, y_label):
+    """Vega-Lite version of line_chart_png."""
+    frames = []
+    for country, values in values_by_country.items():
+        x, y = present_points(years, values)
+        frames.append(pd.DataFrame({"Country": country, "Year": x.astype(int), y_label: y / scale}))
+    data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame({"Country": [], "Year": [], y_label: []})
+    return alt.Chart(data, title=title).mark_line(point=True).encode(
+        x=alt.X("Year:Q", axis=alt.Axis(format="d")), # format="d" so that years display without a comma
+        y=alt.Y(f"{y_label}:Q"),
+        color="Country:N",
+        tooltip=["Country", "Year", alt.Tooltip(f"{y_label}:Q", format=",.2f")],
+    )
+
+
+def bar_chart_spec(title, countries, values, scale, y_label):
+    """Vega-Lite version of bar_chart_png."""
+    data = pd.DataFrame({"Country": list(countries), y_label: np.asarray(values, dtype="float64") / scale})
+    bars = alt.Chart(data, title=title).mark_bar(color="green").encode(x=alt.X("Country:N", sort=None), y=f"{y_label}:Q")
+    labels = bars.mark_text(dy=-6).encode(text=alt.Text(f"{y_label}:Q", format=".2f")) # Value labels above the bars
+    return bars + labels
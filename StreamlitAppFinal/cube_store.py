@@ -0,0 +1,102 @@
+# Shared on-disk store for the (series, country, year) cube of the Country Comparison App
+# Each dataset's cube is written once as a .npy file (plus its labels as JSON) in its own version directory, and
+# every session then opens it with np.load(mmap_mode="r"). The operating system keeps one copy of the file's
+# pages in memory for all sessions and worker processes, instead of every process holding its own float64 cube.
+#
+# A new version is written into a temporary directory and renamed into place in one step, so a reader either
+# finds a complete cube or none at all. An updated bulk file has a new modification time, so it gets a new key
+# (see ingest.file_key) and a new directory; sessions still mapping the old version keep working until they rerun.
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from query import WDIIndex
+
+STORE_DIR = os.path.join(os.path.dirname(__file__), ".cache", "cubes")
+MAX_VERSIONS = 8 # Cube directories kept on disk; the oldest are removed when a new one is published
+FORMAT = 1 # Bumped if the file layout changes, so old directories are simply ignored
+
+
+def _version_dir(key, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"v{FORMAT}-{key}")
+
+
+def has_cube(key, store_dir=STORE_DIR):
+    """Whether a cube for this key has been published (a cheap check, the files aren't opened)."""
+    return os.path.isdir(_version_dir(key, store_dir))
+
+
+def open_cube(key, store_dir=STORE_DIR):
+    """WDIIndex backed by a read-only memory map of the stored cube, or None if there is no cube for this key."""
+    path = _version_dir(key, store_dir)
+    try:
+        with open(os.path.join(path, "labels.json"), encoding="utf-8") as handle:
+            labels = json.load(handle)
+        values = np.load(os.path.join(path, "values.npy"), mmap_mode="r")
+        years = np.arange(labels["first_year"], labels["first_year"] + labels["n_years"], dtype="int16")
+        shape = (len(labels["series"]), len(labels["countries"]), len(years))
+    except (OSError, ValueError, KeyError, TypeError): # Missing, corrupt or half-deleted cube - the caller builds it again
+        return None
+    if values.shape != shape:
+        return None
+    return WDIIndex(values, labels["series"], labels["countries"], years)
+
+
+def _discard(path, store_dir):
+    # Moves a broken version directory out of the way in one rename (so nobody sees it half-deleted), then deletes it
+    if not os.path.isdir(path):
+        return
+    trash = tempfile.mkdtemp(prefix=".old-", dir=store_dir)
+    try:
+        os.rename(path, os.path.join(trash, "cube"))
+    except OSError: # Another process already moved it
+        pass
+    shutil.rmtree(trash, ignore_errors=True)
+
+
+def publish_cube(key, index, store_dir=STORE_DIR):
+    """Write the cube of index for this key, unless another session already published a readable one.
+
+    A version directory that exists but can't be opened (corrupt, or half removed by prune) is replaced.
+    Returns False if the cube couldn't be stored (e.g. the disk is read-only).
+    """
+    path = _version_dir(key, store_dir)
+    if open_cube(key, store_dir) is not None:
+        return True
+    try:
+        os.makedirs(store_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=store_dir)
+    except OSError:
+        return False
+    try:
+        np.save(os.path.join(tmp_dir, "values.npy"), np.ascontiguousarray(index.values, dtype="float64"))
+        labels = {"series": [str(s) for s in index.series], "countries": [str(c) for c in index.countries],
+                  "first_year": int(index.years[0]), "n_years": len(index.years)}
+        with open(os.path.join(tmp_dir, "labels.json"), "w", encoding="utf-8") as handle:
+            json.dump(labels, handle)
+        _discard(path, store_dir)
+        os.rename(tmp_dir, path) # Atomic: readers never see a half-written directory
+    except OSError:
+        # Either the disk is read-only/full or another process renamed its copy into place first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return open_cube(key, store_dir) is not None
+    prune(store_dir)
+    return True
+
+
+def prune(store_dir=STORE_DIR, keep=MAX_VERSIONS):
+    """Remove all but the `keep` most recently published cubes.
+
+    Deleting a directory doesn't break sessions that still have it mapped (on Linux/macOS the pages stay valid until
+    the map is closed); on Windows the removal fails and is retried after the next publish.
+    """
+    try:
+        entries = [entry for entry in os.scandir(store_dir) if entry.is_dir() and entry.name.startswith("v")]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,195 @@
+# Ingest stage for the Country Comparison App
+# Turning a World Bank CSV into the tidy long table (rename the year columns, melt, convert to numbers) only
+# has to happen once per distinct input. The result is keyed by a hash of the uploaded bytes, or by the
+# modification time of the bundled sample file, and is also written to a local Parquet/Feather cache so a
+# cold start can skip parsing the CSV altogether.
+#
+# CSVs are read in chunks, keeping only the id and year columns and (optionally) only the requested series and
+# countries, and each chunk is melted on its own. That way a full multi-hundred-MB bulk download (WDIData.csv)
+# only ever has one chunk of the wide table in memory, next to the compact long rows kept so far.
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+REQUIRED_COLS = ["Country Name", "Country Code", "Series Name", "Series Code"]
+# The bulk download calls the series "indicators"; the DataBank export calls them "series"
+BULK_RENAME = {"Indicator Name": "Series Name", "Indicator Code": "Series Code"}
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache")
+MAX_CACHED = 8 # Tidy tables kept in CACHE_DIR (like the cube store, the oldest are removed first)
+
+
+class MissingColumnsError(ValueError):
+    """Raised when a CSV doesn't have the columns of a World Bank DataBank export."""
+
+
+def upload_key(raw_bytes):
+    """Cache key for an uploaded file: a hash of its contents."""
+    return "upload-" + hashlib.sha1(raw_bytes).hexdigest()
+
+
+def file_key(path):
+    """Cache key for a file on disk: its name, size and modification time."""
+    stat = os.stat(path)
+    return f"file-{os.path.basename(path)}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def filter_key(key, series=None, countries=None):
+    """Extend a cache key with the series/country filters, since a filtered load is a different table."""
+    if not series and not countries:
+        return key
+    filters = json.dumps([sorted(series or []), sorted(countries or [])])
+    return key + "-" + hashlib.sha1(filters.encode("utf-8")).hexdigest()[:12]
+
+
+def is_year_col(col):
+    # "2000 [YR2000]" in DataBank exports, plain "2000" in the bulk download
+    return "YR" in col or col.strip().isdigit()
+
+
+def tidy_wdi(df, series=None, countries=None):
+    """Wide DataBank export (or bulk download) -> long table with categorical names, int16 years and float64 values.
+
+    series/countries optionally restrict the rows to those codes or names.
+    """
+    df = df.rename(columns=BULK_RENAME)
+    # To prevent crashing if a user uploads a random file with unrelated data
+    if not all(col in df.columns for col in REQUIRED_COLS):
+        raise MissingColumnsError("Missing required columns. Please upload a valid World Bank-style dataset.")
+
+    # The World Bank data downloads include some irrelevant information below the tables in the csv, so this drops these rows where each of the necessary four columns aren't empty.
+    df = df.dropna(subset=REQUIRED_COLS)
+    if series:
+        df = df[df["Series Code"].isin(series) | df["Series Name"].isin(series)]
+    if countries:
+        df = df[df["Country Code"].isin(countries) | df["Country Name"].isin(countries)]
+
+    # Rename year columns from, for example, "2000 [YR2000]" to just "2000".
+    year_cols = [col for col in df.columns if is_year_col(col)]
+    rename_dict = {col: col.split(" ")[0] for col in year_cols}
+    df = df.rename(columns=rename_dict)
+
+    # Melt into long format (originally in wide)
+    df_long = pd.melt(df, id_vars=["Country Name", "Series Name"], value_vars=list(rename_dict.values()), var_name="Year", value_name="Value")
+
+    # Convert year and value to numeric (initially read as strings from CSV, with ".." for missing values)
+    df_long["Year"] = pd.to_numeric(df_long["Year"], errors="coerce")
+    df_long["Value"] = pd.to_numeric(df_long["Value"], errors="coerce")
+    df_long = df_long.dropna(subset=["Year", "Value"])
+
+    # Compact column types: repeated names become categoricals, years fit in an int16
+    return pd.DataFrame({
+        "Country Name": df_long["Country Name"].astype("category"),
+        "Series Name": df_long["Series Name"].astype("category"),
+        "Year": df_long["Year"].astype("int16"),
+        "Value": df_long["Value"].astype("float64"),
+    }).reset_index(drop=True)
+
+
+def concat_tidy(parts):
+    """Concatenate tidy chunks without falling back to object columns for the categorical names."""
+    if not parts:
+        return tidy_wdi(pd.DataFrame(columns=REQUIRED_COLS))
+    result = {}
+    for col in ["Country Name", "Series Name"]:
+        # sort_categories keeps the categories alphabetical, just like astype("category") on the whole column
+        result[col] = union_categoricals([part[col] for part in parts], sort_categories=True)
+    for col in ["Year", "Value"]:
+        result[col] = pd.concat([part[col] for part in parts], ignore_index=True)
+    return pd.DataFrame(result)
+
+
+def stream_tidy(handle, series=None, countries=None, chunksize=5_000, progress=None, total_bytes=None):
+    """Read a wide WDI CSV from an open binary handle chunk by chunk and return the tidy long table.
+
+    progress, if given, is called with the fraction of total_bytes read so far after every chunk.
+    """
+    columns = list(pd.read_csv(handle, nrows=0).columns)
+    handle.seek(0)
+    if not all(col in {BULK_RENAME.get(c, c) for c in columns} for col in REQUIRED_COLS):
+        raise MissingColumnsError("Missing required columns. Please upload a valid World Bank-style dataset.")
+    # Column projection: only the id columns and the year columns are parsed (e.g. not the bulk file's empty last column)
+    usecols = [col for col in columns if BULK_RENAME.get(col, col) in REQUIRED_COLS or is_year_col(col)]
+
+    parts = []
+    for chunk in pd.read_csv(handle, usecols=usecols, chunksize=chunksize, encoding="utf-8"):
+        part = tidy_wdi(chunk, series, countries)
+        if len(part):
+            parts.append(part)
+        if progress is not None and total_bytes:
+            progress(min(handle.tell() / total_bytes, 1.0))
+    return concat_tidy(parts)
+
+
+def _cache_path(key):
+    # Parquet needs pyarrow (or fastparquet); Feather needs pyarrow too, so check what is installed
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return os.path.join(CACHE_DIR, key + ".parquet")
+
+
+def read_cached(key):
+    """Tidy table for this key from the on-disk cache, or None if it isn't there (or can't be read)."""
+    path = _cache_path(key)
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception: # A half-written or incompatible cache file just means parsing the CSV again
+        return None
+
+
+def write_cached(key, df_long):
+    path = _cache_path(key)
+    if path is None:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        df_long.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path) # Other sessions never see a partially written file
+    except OSError: # A read-only deployment can still run without the disk cache
+        return
+    prune_cached()
+
+
+def prune_cached(keep=MAX_CACHED):
+    """Remove all but the `keep` most recently written tidy tables, so uploads don't pile up on disk."""
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR) if entry.is_file() and entry.name.endswith(".parquet")]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        try:
+            os.remove(entry.path)
+        except OSError: # Already removed by another session (or still open on Windows) - tried again next time
+            pass
+
+
+def load_tidy(key, read_csv):
+    """Tidy table for key: from the disk cache if present, otherwise parsed with read_csv() and then cached."""
+    df_long = read_cached(key)
+    if df_long is None:
+        df_long = read_csv()
+        write_cached(key, df_long)
+    return df_long
+
+
+def load_upload(raw_bytes, series=None, countries=None, progress=None, key=None):
+    """Tidy table for the bytes of an uploaded CSV (key can be passed in if the caller already hashed them)."""
+    key = key or filter_key(upload_key(raw_bytes), series, countries)
+    return load_tidy(key, lambda: stream_tidy(io.BytesIO(raw_bytes), series, countries, progress=progress, total_bytes=len(raw_bytes)))
+
+
+def load_file(path, series=None, countries=None, progress=None):
+    """Tidy table for a CSV on disk, such as the bundled sample data or a bulk WDIData.csv download."""
+    def read_csv():
+        with open(path, "rb") as handle:
+            return stream_tidy(handle, series, countries, progress=progress, total_bytes=os.path.getsize(path))
+    return load_tidy(filter_key(file_key(path), series, countries), read_csv)
@@ -1,8 +1,18 @@
 # Install dependencies
 import streamlit as st
-import pandas as pd # For working with dataframes
-import matplotlib.pyplot as plt # For plotting charts/data visualizations
+import time # For measuring how long the charts take to render
+from charts import SCALES, bar_chart_png, bar_chart_spec, choose_scale, line_chart_png, line_chart_spec # Shared chart rendering
 import os # Needed to resolve issue of reading in the sample data when I deployed to streamlit cloud
+from query import WDIIndex # Pre-built (series, country, year) cube for fast filtering
+from cube_store import has_cube, open_cube, publish_cube # Memory-mapped cubes shared by all sessions
+from summary import LatestTable # Precomputed latest values, growth rates and ranks
+from ingest import MissingColumnsError, file_key, filter_key, load_file, load_upload, upload_key # Cached CSV -> tidy table ingest
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")) # Modules shared with the other apps
+from instrumentation import show_panel, span, start_rerun, timed # Per-stage timings (only when APP_PROFILE is set)
+
+# Times each stage of this rerun if profiling is switched on (see instrumentation.py)
+start_rerun("Country Comparison App")
 
 # Main title of the app
 st.title("🌍 Country Comparison App 🌍")
@@ -17,87 +27,197 @@ st.sidebar.header("Data Input")
 st.sidebar.write("If you would prefer to upload a new dataset with different countries and indicators, download your desired data from this [World Bank Database](https://databank.worldbank.org/source/world-development-indicators).")
 uploaded_file = st.sidebar.file_uploader("Upload a World Bank-style CSV here:", type=["csv"])
 
-# Use uploaded file if available, otherwise load sample data
-if uploaded_file:
-    df = pd.read_csv(uploaded_file)
-    st.sidebar.success("File uploaded.") # Give green message confirming that user data was uploaded
-else:
-    # I had trouble with reading in the sample data when deploying the app to streamlit cloud
-    # Came across this solution in troubleshooting. Using os ensures the file is found relative to the script, not just wherever the code happens to execute
-    current_dir = os.path.dirname(__file__)  # Gets the directory this script is in
-    file_path = os.path.join(current_dir, 'data', 'wdi_data.csv')  # Builds the full path to the sample data file
-    df = pd.read_csv(file_path, encoding='utf-8')  # Reads the file using this path
-    st.sidebar.info("Currently using sample dataset.") # Indicates that the data being used is the sample dataset
-
+# Full World Bank bulk downloads (WDIData.csv) are several hundred MB, so they can be read straight from disk on the
+# server and restricted to a few indicators/countries while reading
+with st.sidebar.expander("Large files (World Bank bulk download)"):
+    bulk_path = st.text_input("Path to a WDIData.csv file on the server (optional)").strip()
+    series_filter = st.text_input("Only load these indicator codes or names (comma-separated, optional)")
+    country_filter = st.text_input("Only load these country codes or names (comma-separated, optional)")
+selected_series = [s.strip() for s in series_filter.split(",") if s.strip()]
+selected_country_codes = [c.strip() for c in country_filter.split(",") if c.strip()]
+
+# The cube for each distinct input (keyed by a hash of the upload, or the modification time of the file, plus the
+# filters) is written to disk once and memory-mapped by every session and worker process, so the CSV only has to be
+# parsed (and the tidy long table only held in memory) by whichever session sees a dataset first
+@st.cache_resource(max_entries=8, show_spinner="Preparing data...")
+def get_index(key, _df_long=None):
+    data_index = open_cube(key)
+    if data_index is None:
+        if _df_long is None:
+            # The stored cube is unreadable or was pruned after has_cube() saw it. Raising (instead of returning
+            # None) keeps the failure out of the cache, and load_index rebuilds the cube from the CSV
+            raise FileNotFoundError(f"No readable cube for {key}")
+        # Pack the long table into a (series, country, year) cube, so each selection is a slice instead of a scan
+        data_index = WDIIndex.from_long(_df_long)
+        if publish_cube(key, data_index):
+            data_index = open_cube(key) or data_index # Swap the in-memory cube for the shared memory map
+    return data_index
+
+# The CSV is read outside the cached function, because the progress bar below can't be replayed from the cache
+def load_index(key, load_tidy):
+    if has_cube(key):
+        try:
+            with span("open cube"):
+                return get_index(key)
+        except FileNotFoundError: # Broken or just-pruned cube - built again from the CSV below
+            pass
+    with span("load tidy table"):
+        df_long = load_tidy()
+    if df_long.empty:
+        return None
+    with span("build cube"):
+        return get_index(key, df_long)
+
+# Progress bar for reading the CSV chunk by chunk (only visible while a new file is being read)
+progress_slot = st.sidebar.empty()
+def show_progress(fraction):
+    progress_slot.progress(fraction, text=f"Reading CSV... {fraction:.0%}")
+
+# Use uploaded file if available, otherwise load the bulk file or the sample data
+try:
+    if uploaded_file:
+        raw_bytes = uploaded_file.getvalue()
+        data_key = filter_key(upload_key(raw_bytes), selected_series, selected_country_codes) # Identifies this dataset in the caches below
+        data_index = load_index(data_key, lambda: load_upload(raw_bytes, selected_series, selected_country_codes, progress=show_progress, key=data_key))
+        st.sidebar.success("File uploaded.") # Give green message confirming that user data was uploaded
+    elif bulk_path:
+        if not os.path.isfile(bulk_path):
+            st.error(f"File not found: {bulk_path}")
+            st.stop()
+        data_key = filter_key(file_key(bulk_path), selected_series, selected_country_codes)
+        data_index = load_index(data_key, lambda: load_file(bulk_path, selected_series, selected_country_codes, progress=show_progress))
+        st.sidebar.success("Bulk file loaded.")
+    else:
+        # I had trouble with reading in the sample data when deploying the app to streamlit cloud
+        # Came across this solution in troubleshooting. Using os ensures the file is found relative to the script, not just wherever the code happens to execute
+        current_dir = os.path.dirname(__file__)  # Gets the directory this script is in
+        file_path = os.path.join(current_dir, 'data', 'wdi_data.csv')  # Builds the full path to the sample data file
+        data_key = filter_key(file_key(file_path), selected_series, selected_country_codes)
+        data_index = load_index(data_key, lambda: load_file(file_path, selected_series, selected_country_codes))  # Reads the file using this path (only on the first run)
+        st.sidebar.info("Currently using sample dataset.") # Indicates that the data being used is the sample dataset
 # To prevent crashing if user uploads a random file with unrelated data, shows an error message and stops the app if the required columns for the dropdowns aren't present.
-required_cols = ["Country Name", "Country Code", "Series Name", "Series Code"]
-if not all(col in df.columns for col in required_cols):
-    st.error("Missing required columns. Please upload a valid World Bank-style dataset.")
+except MissingColumnsError as e:
+    st.error(str(e))
     st.stop()
+progress_slot.empty()
 
-# The World Bank data downloads include some irrelevant information below the tables in the csv, so this drops these rows where each of the necessary four columns aren't empty.
-# Also drops rows in the actual data where a country may not have data on a certain series (e.g. variable like GDP) for whatever reason.
-df = df.dropna(subset=required_cols)
-
-# Rename year columns from, for example, "2000 [YR2000]" to just "2000".
-year_cols = [col for col in df.columns if "YR" in col] # Creating list of the column names that contain "YR", identifying the year columns (there is a column for each year in the wide format).
-rename_dict = {col: col.split(" ")[0] for col in year_cols} # Creating a dictionary defining each column name as just the year number
-df = df.rename(columns=rename_dict)
-
-# Melt into long format (originally in wide) 
-df_long = pd.melt(df, id_vars=["Country Name", "Series Name"], value_vars=rename_dict.values(), var_name="Year", value_name="Value")
+if data_index is None:
+    st.error("No data matched the selected indicators/countries.")
+    st.stop()
 
-# Convert year and value to numeric (initially read as strings from CSV)
-df_long["Year"] = pd.to_numeric(df_long["Year"], errors="coerce") # errors="coerce" ignores bad rows that can't be converted for whatever reason
-df_long["Value"] = pd.to_numeric(df_long["Value"], errors="coerce") 
-df_long = df_long.dropna(subset=["Year", "Value"]) # Drop missing values
+# Latest available value, growth rates and rank for every (indicator, country), also computed once per dataset
+@st.cache_resource(max_entries=8)
+def get_latest_table(key, windows, _data_index):
+    return LatestTable(_data_index, windows)
 
 ### SIDEBAR: User Selections
 
 st.sidebar.header("Comparison Selections")
 
 # Dynamic country and indicator lists from the dataset
-available_countries = sorted(df_long["Country Name"].unique()) # Gets all of the unique country names from the dataset and puts them in alphabetical order
-available_indicators = sorted(df_long["Series Name"].unique()) # Gets all of the unique indicators from the dataset and puts them in alphabetical order
+available_countries = data_index.countries # All of the unique country names from the dataset, already in alphabetical order
+available_indicators = data_index.series # All of the unique indicators from the dataset, already in alphabetical order
 
 # Multi-select for countries - allow user to select any number of countries to compare against each other
 selected_countries = st.sidebar.multiselect("Select countries to compare", available_countries, default=available_countries[:2]) # By default selecting the first 2 countries in the list so that there isn't just an empty display when the app is launched
 
-# Selectbox for indicator
-selected_indicator = st.sidebar.selectbox("Select indicator", available_indicators)
+# Either one indicator in detail, or a dashboard comparing several indicators side by side
+view = st.sidebar.radio("View", ["Single indicator", "Dashboard (multiple indicators)"])
+if view == "Single indicator":
+    # Selectbox for indicator
+    selected_indicator = st.sidebar.selectbox("Select indicator", available_indicators)
+else:
+    selected_indicators = st.sidebar.multiselect("Select indicators", available_indicators, default=available_indicators[:4])
+    panels_per_row = st.sidebar.slider("Charts per row", min_value=1, max_value=4, value=2)
+
+# Chart backend - matplotlib draws static (cached) images, Vega-Lite sends a lightweight interactive chart to the browser
+backend = st.sidebar.radio("Chart backend", ["Matplotlib", "Vega-Lite"], horizontal=True)
 
 # Year range slider based on available data, allowing user to limit year range in the comparison
-min_year = int(df_long["Year"].min())
-max_year = int(df_long["Year"].max())
+min_year = int(data_index.years[0])
+max_year = int(data_index.years[-1])
 selected_years = st.sidebar.slider("Select year range", min_value=min_year, max_value=max_year, value=(min_year, max_year))
 
+# Growth-rate windows for the ranking table
+cagr_windows = st.sidebar.multiselect("Growth rate (CAGR) windows in years", [1, 3, 5, 10, 20], default=[5, 10])
+with span("latest-value table"):
+    latest_table = get_latest_table(data_key, tuple(sorted(cagr_windows)), data_index)
+
+def latest_values(countries, indicator, years):
+    # Each country's latest year with data: straight from the precomputed table when the range reaches the end of the
+    # data (the default), otherwise from the selected slice of the index. Either way, countries whose latest data is
+    # older than the start of the range are left out
+    if years[1] >= max_year:
+        latest = latest_table.lookup(countries, indicator)
+        return latest[latest["Latest Year"] >= years[0]].reset_index(drop=True)
+    return data_index.latest(countries, indicator, years)
+
+def bar_labels(recent):
+    # Countries whose latest data is older than the others get their actual latest year in the label
+    newest = recent["Latest Year"].max()
+    return [country if year == newest else f"{country} ({year})" for country, year in zip(recent["Country Name"], recent["Latest Year"])]
+
 ### MAIN DISPLAY AREA
 
-#  Filter for selected data, creating a new dataframe containing only the selected countries, indicator, and year range
-filtered = df_long[
-    (df_long["Country Name"].isin(selected_countries)) &
-    (df_long["Series Name"] == selected_indicator) &
-    (df_long["Year"] >= selected_years[0]) &
-    (df_long["Year"] <= selected_years[1])
-]
+# Every chart goes through this one function, which caches the finished PNG by dataset, chart type, countries,
+# indicator, years and scale - so reruns that don't change a chart just look it up instead of redrawing it
+@st.cache_data(max_entries=256, show_spinner=False)
+def chart_png(kind, data_key, countries, indicator, years, scale, _chart_data):
+    # _chart_data is the already-sliced data for the chart (not hashed - it is fully determined by the other arguments)
+    y_label = dict(SCALES)[scale]
+    if kind == "line":
+        chart_years, values_by_country = _chart_data
+        return line_chart_png(indicator, chart_years, values_by_country, scale, y_label)
+    return bar_chart_png(f"{indicator} (latest available year)", bar_labels(_chart_data), _chart_data["Latest Value"], scale, y_label)
+
+@timed("draw charts")
+def show_chart(kind, countries, indicator, years, scale, chart_data):
+    # Draws one chart with the selected backend
+    if backend == "Matplotlib":
+        st.image(chart_png(kind, data_key, tuple(countries), indicator, tuple(years), scale, chart_data))
+    elif kind == "line":
+        chart_years, values_by_country = chart_data
+        st.altair_chart(line_chart_spec(indicator, chart_years, values_by_country, scale, dict(SCALES)[scale]))
+    else:
+        st.altair_chart(bar_chart_spec(f"{indicator} (latest available year)", bar_labels(chart_data), chart_data["Latest Value"], scale, dict(SCALES)[scale]))
+
+def show_render_time(seconds):
+    # Keeps the latest chart render time of each backend, so the two can be compared side by side
+    render_times = st.session_state.setdefault("render_times", {})
+    render_times[backend] = seconds
+    st.sidebar.caption("Latest chart render time: " + ", ".join(f"{name} {ms * 1000:.0f} ms" for name, ms in render_times.items()))
+
+render_started = time.perf_counter()
+
+if view != "Single indicator":
+    st.header("📊 Indicator Dashboard")
+    st.write(f"These charts compare **{len(selected_indicators)}** indicators from **{selected_years[0]}** to **{selected_years[1]}** " + f"for: **{', '.join(selected_countries)}**.")
+    if not selected_countries or not selected_indicators:
+        st.warning("Please select at least one country and one indicator.")
+    # Small-multiples grid, filled row by row
+    for row_start in range(0, len(selected_indicators), panels_per_row):
+        columns = st.columns(panels_per_row)
+        for column, indicator in zip(columns, selected_indicators[row_start:row_start + panels_per_row]):
+            with span("filter"):
+                panel_data = data_index.query(selected_countries, indicator, selected_years)
+            scale, _ = choose_scale(list(panel_data[1].values())) # One vectorised pass over this indicator's values
+            with column:
+                if selected_countries:
+                    show_chart("line", selected_countries, indicator, selected_years, scale, panel_data)
+    show_render_time(time.perf_counter() - render_started)
+    show_panel()
+    st.stop()
+
+#  Filter for selected data by slicing the index, creating a new dataframe containing only the selected countries,
+#  indicator, and year range
+with span("filter"):
+    years, values_by_country = data_index.query(selected_countries, selected_indicator, selected_years)
+    filtered = data_index.to_frame(selected_countries, selected_indicator, selected_years)
 
 # Line chart section
 
-# Determine appropriate scaling factor based on largest value
-max_val = filtered["Value"].max()
-
-if max_val >= 1_000_000_000_000:
-    scale = 1_000_000_000_000
-    y_label = "Value (Trillions)"
-elif max_val >= 1_000_000_000:
-    scale = 1_000_000_000
-    y_label = "Value (Billions)"
-elif max_val >= 1_000_000:
-    scale = 1_000_000
-    y_label = "Value (Millions)"
-else:
-    scale = 1
-    y_label = "Value"
+# Determine appropriate scaling factor (e.g. millions, billions) based on largest value
+scale, y_label = choose_scale(list(values_by_country.values()))
 
 # Plotting the actual chart
 st.header(f"📈 Line Chart: {selected_indicator}") # Chart title with selected indicator
@@ -107,66 +227,47 @@ st.write(f"This line chart displays trends in **{selected_indicator}** from **{s
 if filtered.empty or len(selected_countries) == 0:
     st.warning("Please select at least one country and an indicator with available data.")
 else:
-    fig, ax = plt.subplots()
-    for country in selected_countries: # Plotting a line for each selected country
-        country_data = filtered[filtered["Country Name"] == country] # Getting a dataframe including the data for a specific country for the selected indicator/years... filtering the already filtered df
-        scaled_values = country_data["Value"] / scale # Ensuring the values that show up on the axis are scaled to match the scale indicated in the axis label
-        ax.plot(country_data["Year"], scaled_values, marker="o", label=country) # Plot the values
-
-    ax.set_title(selected_indicator)
-    ax.set_xlabel("Year")
-    ax.set_ylabel(y_label)
-    ax.legend()
-    ax.grid(True)
-    st.pyplot(fig)
+    show_chart("line", selected_countries, selected_indicator, selected_years, scale, (years, values_by_country))
 
 # Bar chart section
 
 st.header("📊 Bar Chart (Most Recent Year)")
 
-# Get the most recent year in the filtered data
-most_recent_year = filtered["Year"].max()
-recent_data = filtered[filtered["Year"] == most_recent_year]
+# Get each country's most recent year with data (countries with older data keep their own latest year)
+with span("latest values"):
+    recent_data = latest_values(selected_countries, selected_indicator, selected_years)
 
-st.write(f"This bar chart compares **{selected_indicator}** in the year **{most_recent_year}** " + f"between: **{', '.join(selected_countries)}**.")
+st.write(f"This bar chart compares **{selected_indicator}** in the most recent year with data for each of: **{', '.join(recent_data['Country Name'])}**. " + "Countries whose latest data is older show that year next to their name.")
 
-if not recent_data.empty: # Only graph if there is data from the most recent year for any of the selected countries
-    
+if not recent_data.empty: # Only graph if any of the selected countries have data in the selected years
     # Determine appropriate scaling (same as in line graph)
-    max_val_bar = recent_data["Value"].max() # Grab max value of the bar
-
-    # Adjust scale depending on max value, re-label y-axis to reflect this
-    if max_val_bar >= 1_000_000_000_000:
-        scale_bar = 1_000_000_000_000
-        y_label_bar = "Value (Trillions)"
-    elif max_val_bar >= 1_000_000_000:
-        scale_bar = 1_000_000_000
-        y_label_bar = "Value (Billions)"
-    elif max_val_bar >= 1_000_000:
-        scale_bar = 1_000_000
-        y_label_bar = "Value (Millions)"
-    else:
-        scale_bar = 1
-        y_label_bar = "Value"
-
-    # Scale the data 
-    recent_data_scaled = recent_data.copy()
-    recent_data_scaled["Scaled Value"] = recent_data_scaled["Value"] / scale_bar # divide the value by the scale (e.g., 1 trillion/1 trillion = 1, will display as 1)
-
-    # Plot the graph
-    fig2, ax2 = plt.subplots()
-    bars = ax2.bar(recent_data_scaled["Country Name"], recent_data_scaled["Scaled Value"], color="green") # defining "bars" so that I can add value labels
-    ax2.set_ylabel(y_label_bar)
-    ax2.set_title(f"{selected_indicator} in {int(most_recent_year)}")
-    # Add value labels above bars
-    ax2.bar_label(bars, fmt="%.2f", label_type="edge")
-
-    st.pyplot(fig2)
+    scale_bar, _ = choose_scale(recent_data["Latest Value"])
+    show_chart("bar", selected_countries, selected_indicator, selected_years, scale_bar, recent_data)
 else:
-    st.warning("No data available for the most recent year.") # Display this message if the selected countries don't have data from the most recent available year
+    st.warning("No data available for the selected countries and years.")
+show_render_time(time.perf_counter() - render_started)
+
+# Ranking table section - read straight from the precomputed table, so it only touches the selected rows
+st.header("🏆 Rankings (Latest Available Data)")
+st.write(f"Where each selected country ranks among all countries in the dataset on **{selected_indicator}**, using each country's latest available year, plus its compound annual growth rate (CAGR) over the selected windows.")
+with span("rankings lookup"):
+    rankings = latest_table.lookup(selected_countries, selected_indicator)
+if rankings.empty:
+    st.warning("No data available for the selected countries.")
+else:
+    cagr_cols = [col for col in rankings.columns if col.startswith("CAGR")]
+    rankings[cagr_cols] = rankings[cagr_cols] * 100 # Growth rates shown as percentages
+    st.dataframe(rankings, hide_index=True, column_config={
+        "Latest Year": st.column_config.NumberColumn(format="%d"), # So that year displays without comma
+        "Latest Value": st.column_config.NumberColumn(format="%.2f"),
+        **{col: st.column_config.NumberColumn(format="%.2f%%") for col in cagr_cols},
+    })
 
 # Show filtered data as a table
 st.header("Filtered Data Table")
-filtered_display = filtered.copy()
-filtered_display["Year"] = filtered_display["Year"].astype(str) # astype(str) so that year displays without comma
-st.dataframe(filtered_display)
\ No newline at end of file
+with span("data table"):
+    filtered_display = filtered.copy()
+    filtered_display["Year"] = filtered_display["Year"].astype(str) # astype(str) so that year displays without comma
+    st.dataframe(filtered_display)
+
+show_panel()
@@ -0,0 +1,63 @@
+# Indexed query engine for the Country Comparison App
+# The tidy long table is packed once into a dense float64[series, country, year] cube (NaN where there is no
+# data). Answering "these countries, this indicator, this year range" is then a matter of slicing the cube
+# instead of building boolean masks over every row of the long table on each rerun.
+import numpy as np
+import pandas as pd
+
+
+class WDIIndex:
+    """Dense (series, country, year) cube plus the label lookups needed to slice it."""
+
+    def __init__(self, values, series, countries, years):
+        self.values = values # float64 array of shape (len(series), len(countries), len(years))
+        self.series = list(series)
+        self.countries = list(countries)
+        self.years = np.asarray(years) # Consecutive years, so a year maps to a position by subtraction
+        self.series_pos = {name: i for i, name in enumerate(self.series)}
+        self.country_pos = {name: i for i, name in enumerate(self.countries)}
+
+    @classmethod
+    def from_long(cls, df_long):
+        """Build the cube from the tidy table produced by ingest.tidy_wdi."""
+        series = df_long["Series Name"].astype("category")
+        countries = df_long["Country Name"].astype("category")
+        first_year, last_year = int(df_long["Year"].min()), int(df_long["Year"].max())
+        years = np.arange(first_year, last_year + 1, dtype="int16")
+        values = np.full((len(series.cat.categories), len(countries.cat.categories), len(years)), np.nan)
+        # Categorical codes are already integer positions, so every row lands in the cube in one vectorised step
+        values[series.cat.codes.to_numpy(), countries.cat.codes.to_numpy(), df_long["Year"].to_numpy() - first_year] = df_long["Value"].to_numpy()
+        return cls(values, series.cat.categories, countries.cat.categories, years)
+
+    def year_slice(self, year_range):
+        first = max(int(year_range[0]) - int(self.years[0]), 0)
+        last = min(int(year_range[1]) - int(self.years[0]), len(self.years) - 1)
+        return slice(first, last + 1)
+
+    def query(self, countries, indicator, year_range):
+        """Return (years, {country: values}) for one indicator; values hold NaN where there is no data."""
+        window = self.year_slice(year_range)
+        plane = self.values[self.series_pos[indicator]]
+        return self.years[window], {country: plane[self.country_pos[country], window] for country in countries if country in self.country_pos}
+
+    def latest(self, countries, indicator, year_range):
+        """Latest year with data within the range, and its value, for each selected country."""
+        years, by_country = self.query(countries, indicator, year_range)
+        rows = []
+        for country, values in by_country.items():
+            present = np.flatnonzero(~np.isnan(values))
+            if len(present): # Countries without any data in the range are left out
+                rows.append((country, int(years[present[-1]]), float(values[present[-1]])))
+        return pd.DataFrame(rows, columns=["Country Name", "Latest Year", "Latest Value"])
+
+    def to_frame(self, countries, indicator, year_range):
+        """The selected slice as a long table (Country Name, Series Name, Year, Value) without the missing values."""
+        years, by_country = self.query(countries, indicator, year_range)
+        frames = []
+        for country, values in by_country.items():
+            present = ~np.isnan(values)
+            frames.append(pd.DataFrame({"Country Name": country, "Series Name": indicator, "Year": years[present], "Value": values[present]}))
+        if not frames:
+            return pd.DataFrame({"Country Name": [], "Series Name": [], "Year": np.array([], dtype="int16"), "Value": []})
+        # Same ordering as the original long table: by year, then country
+        return pd.concat(frames, ignore_index=True).sort_values(["Year", "Country Name"], kind="stable", ignore_index=True)
@@ -0,0 +1,56 @@
+# Precomputed "latest available value" table for the Country Comparison App
+# Built once per dataset from the (series, country, year) cube: for every series/country pair it stores the latest
+# year with data, the value in that year, compound annual growth rates (CAGR) over a few windows, and the rank of
+# the latest value within the series. The bar chart and the ranking table then only look up the selected rows.
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOWS = (5, 10) # CAGR windows in years
+
+
+class LatestTable:
+    """Latest year/value, CAGR and rank for every (series, country) of a WDIIndex."""
+
+    def __init__(self, index, windows=DEFAULT_WINDOWS):
+        self.index = index
+        self.windows = tuple(windows)
+        values = index.values
+        n_series, n_countries, n_years = values.shape
+        has_data = ~np.isnan(values)
+        self.has_data = has_data.any(axis=2)
+        # Position of the last non-null year: the first True when each row is read backwards
+        last = n_years - 1 - np.argmax(has_data[:, :, ::-1], axis=2)
+        self.latest_year = np.where(self.has_data, index.years[last], 0).astype("int16")
+        self.latest_value = np.where(self.has_data, np.take_along_axis(values, last[..., None], axis=2)[..., 0], np.nan)
+
+        # CAGR over each window, ending in the latest year (NaN if the start year is missing or the sign flips)
+        self.cagr = {}
+        for window in self.windows:
+            start = last - window
+            start_value = np.take_along_axis(values, np.clip(start, 0, None)[..., None], axis=2)[..., 0]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                growth = (self.latest_value / start_value) ** (1 / window) - 1
+            growth[(start < 0) | ~(start_value > 0) | ~(self.latest_value >= 0)] = np.nan
+            self.cagr[window] = growth
+
+        # Rank 1 = largest latest value within the series; countries without data are not ranked
+        order = np.argsort(-np.where(self.has_data, self.latest_value, -np.inf), axis=1, kind="stable")
+        self.rank = np.empty((n_series, n_countries), dtype="int32")
+        np.put_along_axis(self.rank, order, np.broadcast_to(np.arange(1, n_countries + 1), order.shape), axis=1)
+        self.rank[~self.has_data] = 0
+        self.ranked = self.has_data.sum(axis=1) # Number of ranked countries per series
+
+    def lookup(self, countries, indicator):
+        """One row per selected country that has data for the indicator."""
+        s = self.index.series_pos[indicator]
+        rows = [(country, self.index.country_pos[country]) for country in countries if country in self.index.country_pos]
+        rows = [(country, c) for country, c in rows if self.has_data[s, c]]
+        table = pd.DataFrame({
+            "Country Name": [country for country, _ in rows],
+            "Latest Year": [int(self.latest_year[s, c]) for _, c in rows],
+            "Latest Value": [float(self.latest_value[s, c]) for _, c in rows],
+            "Rank": [f"{self.rank[s, c]} of {self.ranked[s]}" for _, c in rows],
+        })
+        for window in self.windows:
+            table[f"CAGR {window}y"] = [float(self.cagr[window][s, c]) for _, c in rows]
+        return table
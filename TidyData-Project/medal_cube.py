@@ -0,0 +1,93 @@
+# Medal count cube for the Olympics analysis
+# Every chart and pivot table in the notebook is a count of medals grouped by some of sport, gender and medal type.
+# Rather than scanning the tidy table once per crosstab/value_counts/pivot_table, the medals are counted once into
+# a small array counts[sport, gender, medal]; each view is then that array summed over the axes it doesn't use.
+# New medal rows can be added to the counts without recounting the old ones, and the cube can be saved to disk.
+import numpy as np
+import pandas as pd
+
+AXES = ("sport", "gender", "medal")
+
+
+class MedalCube:
+    """Medal counts for every (sport, gender, medal) combination."""
+
+    def __init__(self, counts, labels):
+        self.counts = np.asarray(counts, dtype="int64")
+        self.labels = {axis: list(labels[axis]) for axis in AXES} # Category names along each axis
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 0, 0), dtype="int64"), {axis: [] for axis in AXES})
+
+    @classmethod
+    def from_tidy(cls, df):
+        """Count a tidy medal table (one row per medal, with sport, gender and medal columns) in one pass."""
+        cube = cls.empty()
+        cube.update(df)
+        return cube
+
+    def update(self, df):
+        """Add the medals in df (new rows only) to the counts, adding any sport/gender/medal not seen before."""
+        positions = []
+        for axis in AXES:
+            codes, values = pd.factorize(df[axis])
+            if (codes < 0).any():
+                raise ValueError(f"Missing values in the {axis!r} column")
+            # Map this batch's own codes onto the cube's positions, appending new categories at the end
+            known = {label: i for i, label in enumerate(self.labels[axis])}
+            for value in values:
+                if value not in known:
+                    known[value] = len(self.labels[axis])
+                    self.labels[axis].append(value)
+            positions.append(np.array([known[value] for value in values], dtype="int64")[codes])
+
+        shape = tuple(len(self.labels[axis]) for axis in AXES)
+        if shape != self.counts.shape:
+            grown = np.zeros(shape, dtype="int64")
+            grown[tuple(slice(0, n) for n in self.counts.shape)] = self.counts
+            self.counts = grown
+        # One bincount over the flattened (sport, gender, medal) position of every row
+        flat = np.ravel_multi_index(positions, shape) if len(df) else np.array([], dtype="int64")
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(shape)
+        return self
+
+    def marginal(self, *axes):
+        """Counts summed over every axis not in axes, with the remaining axes in the order given."""
+        drop = tuple(i for i, axis in enumerate(AXES) if axis not in axes)
+        summed = self.counts.sum(axis=drop)
+        kept = [axis for axis in AXES if axis in axes]
+        return np.transpose(summed, [kept.index(axis) for axis in axes])
+
+    def _order(self, axis):
+        # Sorted labels, like the categorical columns crosstab/pivot_table/value_counts were run on
+        return sorted(range(len(self.labels[axis])), key=lambda i: self.labels[axis][i])
+
+    def table(self, index, columns, fill_value=None):
+        """Two-way count table, like pd.crosstab(df[index], df[columns]) or pivot_table(..., aggfunc="count").
+
+        As with pivot_table, combinations with no medals are NaN unless fill_value is given.
+        """
+        rows, cols = self._order(index), self._order(columns)
+        counts = self.marginal(index, columns)[np.ix_(rows, cols)]
+        result = pd.DataFrame(counts,
+                              index=pd.Index([self.labels[index][i] for i in rows], name=index),
+                              columns=pd.Index([self.labels[columns][i] for i in cols], name=columns))
+        if fill_value is None and (counts == 0).any():
+            return result.where(result != 0)
+        return result.replace(0, fill_value) if fill_value not in (None, 0) else result
+
+    def value_counts(self, axis):
+        """Medals per label of one axis, largest first, like df[axis].value_counts()."""
+        order = self._order(axis)
+        counts = pd.Series(self.marginal(axis)[order], index=pd.Index([self.labels[axis][i] for i in order], name=axis), name="count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def save(self, path):
+        """Save the counts and labels to a .npz file."""
+        np.savez(path, counts=self.counts, **{axis: np.array(self.labels[axis], dtype=str) for axis in AXES})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["counts"], {axis: data[axis].tolist() for axis in AXES})
@@ -0,0 +1,73 @@
+# Tidy-transform for the wide Olympic medalist table
+# The notebook originally melted every (medalist, event) cell into its own row and then dropped the empty ones,
+# which creates a row for every medal each Olympian *could* have won (1,875 x 70 = ~130k rows to keep ~1.9k).
+# Here only the filled-in cells are ever turned into rows, and each "gender_sport" column header is split once
+# instead of once per row. With thousands of event columns the wide CSV can also be read in chunks of rows, so the
+# full wide table never has to be in memory at the same time.
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+ID_COL = "medalist_name"
+MEDALS = ["bronze", "gold", "silver"] # Alphabetical, the same order crosstab/pivot_table used in the notebook
+
+
+def parse_event(header):
+    """Split an event column header like "male_canoeing and kayaking" into (gender, sport)."""
+    gender, sep, sport = header.partition("_")
+    if not sep:
+        raise ValueError(f"Event column {header!r} is not in the form gender_sport")
+    return gender, sport
+
+
+def tidy_medals(wide, id_col=ID_COL):
+    """Wide medalist table -> long table with one row per medal: medalist_name, medal, gender, sport.
+
+    Rows come out in the same order as pd.melt followed by dropna (event by event, then medalist).
+    """
+    events = [col for col in wide.columns if col != id_col]
+    parsed = [parse_event(col) for col in events] # Once per column header, not once per row
+    names = wide[id_col].to_numpy()
+
+    row_parts, event_parts, medal_parts = [], [], []
+    for j, col in enumerate(events):
+        values = wide[col].to_numpy()
+        present = np.flatnonzero(pd.notna(values)) # Only the cells that actually hold a medal
+        if len(present):
+            row_parts.append(present)
+            event_parts.append(np.full(len(present), j))
+            medal_parts.append(values[present])
+    rows = np.concatenate(row_parts) if row_parts else np.array([], dtype=int)
+    event_codes = np.concatenate(event_parts) if event_parts else np.array([], dtype=int)
+    medals = np.concatenate(medal_parts) if medal_parts else np.array([], dtype=object)
+
+    # Each event's gender/sport is looked up through the event's position, so the strings are never split per row
+    genders = pd.Categorical([gender for gender, _ in parsed])
+    sports = pd.Categorical([sport for _, sport in parsed])
+    return pd.DataFrame({
+        id_col: names[rows],
+        "medal": pd.Categorical(medals, categories=sorted(set(MEDALS) | set(medals))),
+        "gender": pd.Categorical.from_codes(genders.codes[event_codes], genders.categories),
+        "sport": pd.Categorical.from_codes(sports.codes[event_codes], sports.categories),
+    })
+
+
+def concat_medals(parts):
+    """Concatenate tidy tables while keeping the categorical columns categorical."""
+    if len(parts) == 1:
+        return parts[0]
+    result = {ID_COL: np.concatenate([part[ID_COL].to_numpy() for part in parts])}
+    for col in ["medal", "gender", "sport"]:
+        result[col] = union_categoricals([part[col] for part in parts], sort_categories=True)
+    return pd.DataFrame(result)
+
+
+def read_tidy(path, chunksize=None, id_col=ID_COL):
+    """Read a wide medalist CSV straight into the long table.
+
+    With chunksize, the CSV is read that many medalists at a time (rows are then ordered chunk by chunk).
+    """
+    if chunksize is None:
+        return tidy_medals(pd.read_csv(path), id_col)
+    parts = [tidy_medals(chunk, id_col) for chunk in pd.read_csv(path, chunksize=chunksize)]
+    return concat_medals(parts) if parts else tidy_medals(pd.read_csv(path, nrows=0), id_col)
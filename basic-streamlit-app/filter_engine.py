@@ -0,0 +1,89 @@
+# Filter engine for Pick A Penguin
+# Instead of comparing every row against the selected species/sex/mass on each slider move, the table is indexed
+# once when it is loaded:
+#   - for each text column (species, sex, island) there is one True/False array per value ("bitmap"), so picking
+#     a species is just looking up an array that already exists
+#   - each numeric column (body mass, bill and flipper size) is sorted once, so a range like "under 4000 grams"
+#     is found with a binary search (np.searchsorted) and only the matching rows are touched
+# Combining the filters is then a few element-wise ANDs of boolean arrays.
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLS = ["species", "sex", "island"]
+NUMERIC_COLS = ["body_mass_g", "bill_length_mm", "bill_depth_mm", "flipper_length_mm"]
+
+
+class PenguinFilter:
+    """Precomputed bitmaps and sorted columns for fast filtering of a penguin-style table."""
+
+    def __init__(self, df, category_cols=CATEGORY_COLS, numeric_cols=NUMERIC_COLS):
+        self.df = df.reset_index(drop=True)
+        self.n_rows = len(self.df)
+
+        # {column: {value: boolean array}} - values keep the order they first appear in (like df[col].unique())
+        self.bitmaps = {}
+        for col in category_cols:
+            codes, values = pd.factorize(self.df[col]) # Missing values get the code -1 and no bitmap
+            self.bitmaps[col] = {value: codes == i for i, value in enumerate(values)}
+
+        # {column: (row numbers ordered by value, the sorted values)} - missing values are left out
+        self.sorted = {}
+        for col in numeric_cols:
+            values = self.df[col].to_numpy(dtype="float64")
+            order = np.flatnonzero(~np.isnan(values))
+            order = order[np.argsort(values[order], kind="stable")]
+            self.sorted[col] = (order, values[order])
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        return cls(pd.read_csv(path), **kwargs)
+
+    def categories(self, col):
+        """The distinct values of a text column (without missing values)."""
+        return list(self.bitmaps[col])
+
+    def bounds(self, col):
+        """(min, max) of a numeric column, or (nan, nan) if every value is missing."""
+        _, values = self.sorted[col]
+        if len(values) == 0:
+            return float("nan"), float("nan")
+        return float(values[0]), float(values[-1])
+
+    def category_mask(self, col, values):
+        """Rows where col is one of values (a single value works too)."""
+        if isinstance(values, str) or not hasattr(values, "__iter__"):
+            values = [values]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for value in values:
+            if value in self.bitmaps[col]:
+                mask |= self.bitmaps[col][value]
+        return mask
+
+    def range_mask(self, col, low=None, high=None):
+        """Rows where low <= col <= high (either end can be None). Rows with a missing value never match."""
+        order, values = self.sorted[col]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        end = len(values) if high is None else np.searchsorted(values, high, side="right")
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[order[start:end]] = True
+        return mask
+
+    def mask(self, equals=None, ranges=None):
+        """Boolean array of the rows matching every filter.
+
+        equals maps a text column to a value (or list of values); ranges maps a numeric column to (low, high).
+        """
+        mask = np.ones(self.n_rows, dtype=bool)
+        for col, values in (equals or {}).items():
+            mask &= self.category_mask(col, values)
+        for col, (low, high) in (ranges or {}).items():
+            mask &= self.range_mask(col, low, high)
+        return mask
+
+    def select(self, equals=None, ranges=None):
+        """Row numbers of the matching rows."""
+        return np.flatnonzero(self.mask(equals, ranges))
+
+    def filter(self, equals=None, ranges=None):
+        """The matching rows as a DataFrame."""
+        return self.df.iloc[self.select(equals, ranges)]
@@ -1,29 +1,63 @@
 # Run the app by opening the terminal and typing streamlit run main.py
 
+import os
+
 import streamlit as st
-import pandas as pd
+
+from filter_engine import PenguinFilter # Precomputed indexes so each filter change is quick
+
+MAX_ROWS_SHOWN = 1_000 # Rows sent to the browser per table
 
 st.title("Pick A Penguin!")
 st.write("Welcome to Pick A Penguin! This app allows you to view details about hundreds of different penguins and select one of them that is right for you.")
 st.write("Below is a table documenting 344 penguins of various species, islands of origin, and sizes.")
 
 # Brings in penguins.csv dataset from  data folder
-df = pd.read_csv("data/penguins.csv")
+# The table is read and indexed only once (not on every slider move) and shared by everyone using the app.
+# Using os makes sure the file is found relative to this script, not wherever the app was started from
+@st.cache_resource
+def load_penguins():
+    return PenguinFilter.from_csv(os.path.join(os.path.dirname(__file__), "data", "penguins.csv"))
 
-# First data table (full and unfiltered)
-st.dataframe(df)
+penguins = load_penguins()
+df = penguins.df
+
+# First data table (full and unfiltered). For very large tables only the first rows are sent to the browser
+st.dataframe(df.head(MAX_ROWS_SHOWN))
+if len(df) > MAX_ROWS_SHOWN:
+    st.caption(f"Showing the first {MAX_ROWS_SHOWN:,} of {len(df):,} rows.")
 
 st.subheader("Filter by species, sex, and body mass to find the penguin that is right for you!")
 
 # Filters by species, sex, and body mass to narrow down the selection of penguins to choose from
-species = st.selectbox("Select a species", df['species'].unique())
+species = st.selectbox("Select a species", penguins.categories("species"))
 sex = st.selectbox("Select a sex", ['male','female']) # I don't do df['sex'] because it includes a "nan" option for the penguins without a listed sex 
-mass = st.slider("Choose a maximum body mass (grams)", min_value=df['body_mass_g'].min(), max_value = df['body_mass_g'].max())
+# A slider needs at least two different values, so it is skipped if a column has no measurements (bounds are nan)
+# or only one distinct value
+min_mass, max_mass = penguins.bounds("body_mass_g")
+ranges = {}
+if min_mass < max_mass:
+    mass = st.slider("Choose a maximum body mass (grams)", min_value=min_mass, max_value=max_mass)
+    ranges["body_mass_g"] = (None, mass)
+
+# Optional extra filters on bill and flipper size. A range is only applied once it is moved away from the full range,
+# so penguins with no measurements aren't dropped unless the user asks for it
+with st.expander("More filters (bill and flipper size)"):
+    for col, label in [("bill_length_mm", "Bill length (mm)"), ("bill_depth_mm", "Bill depth (mm)"), ("flipper_length_mm", "Flipper length (mm)")]:
+        low, high = penguins.bounds(col)
+        if not low < high:
+            continue
+        chosen = st.slider(label, min_value=low, max_value=high, value=(low, high))
+        if chosen != (low, high):
+            ranges[col] = chosen
 
 # Creates and shows filtered dataframe containing only the penguins that match the selected criteria
-filtered_df = df[(df['species'] == species) & (df['sex'] == sex) & (df['body_mass_g'] <= mass)]
-st.write(f"Here are the {sex} {species} penguins weighing under {mass} grams:")
-st.dataframe(filtered_df)
+filtered_df = penguins.filter(equals={"species": species, "sex": sex}, ranges=ranges)
+st.write(f"Here are the {sex} {species} penguins weighing under {mass} grams:" if "body_mass_g" in ranges else f"Here are the {sex} {species} penguins:")
+st.dataframe(filtered_df.head(MAX_ROWS_SHOWN))
+if len(filtered_df) > MAX_ROWS_SHOWN:
+    st.caption(f"Showing the first {MAX_ROWS_SHOWN:,} of {len(filtered_df):,} matching rows.")
+    filtered_df = filtered_df.head(MAX_ROWS_SHOWN) # Only the rows shown can be picked below
 
 # Prompts the user to select a penguin by ID number out of the filtered dataframe 
 if not filtered_df.empty:
@@ -0,0 +1,313 @@
+# Headless benchmarks for the Streamlit apps in this portfolio
+# Each app is copied to a temporary folder with its bundled data scaled up (the rows repeated `scale` times, renamed so
+# they aren't exact duplicates), then driven with Streamlit's AppTest through a fixed script of widget changes, the way
+# a user would click through it. Every step is one rerun of the script and records:
+#   - wall time and CPU time
+#   - peak Python allocations during the step (tracemalloc)
+#   - peak RSS of the process so far
+# Each (scenario, scale) runs in its own Python process, so Streamlit's caches and the memory peaks of one run don't
+# leak into the next. The results are compared with a saved baseline (benchmarks/baseline.json by default) and every
+# step that got slower or bigger by more than --tolerance is reported as a regression (exit code 1).
+#
+# Usage (from the repository root):
+#   python benchmarks/run_benchmarks.py                           # every scenario at 10x and 100x
+#   python benchmarks/run_benchmarks.py --scales 10 100 1000 --only wdi penguins
+#   python benchmarks/run_benchmarks.py --update-baseline         # save this run as the new baseline
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError: # Not available on Windows; RSS is then left out
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_SCALES = [10, 100]
+APP_TIMEOUT = 900 # Seconds AppTest waits for one rerun
+MIN_SECONDS = 0.05 # Changes smaller than these are ignored as noise, whatever the percentage
+MIN_MB = 2.0
+METRICS = [("wall_s", MIN_SECONDS), ("alloc_peak_mb", MIN_MB), ("rss_peak_mb", MIN_MB)]
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Register a scenario: a generator that sets up its data in tmp and yields (step name, action) pairs."""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+# Helpers for the scenarios
+def copy_app(app, tmp):
+    target = tmp / Path(app).name
+    shutil.copytree(ROOT / app, target, ignore=shutil.ignore_patterns(".cache", "__pycache__", "*.npz"))
+    if not (tmp / "shared").exists(): # Modules the apps import from ../shared
+        shutil.copytree(ROOT / "shared", tmp / "shared", ignore=shutil.ignore_patterns("__pycache__"))
+    return target
+
+
+def app_test(script):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(str(script), default_timeout=APP_TIMEOUT)
+
+
+def rerun(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"The app raised an exception: {at.exception[0].message}")
+
+
+def widget(elements, label):
+    # Widgets are found by label (or by the start of it, for labels like "Page (of 12)")
+    for element in elements:
+        if element.label == label or element.label.startswith(label):
+            return element
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def set_widget(at, kind, label, value):
+    widget(getattr(at, kind), label).set_value(value)
+    rerun(at)
+
+
+# Scenarios
+@scenario("penguins")
+def penguins_scenario(tmp, scale):
+    app = copy_app("basic-streamlit-app", tmp)
+    df = pd.read_csv(app / "data" / "penguins.csv")
+    big = pd.concat([df] * scale, ignore_index=True)
+    big["id"] = range(len(big))
+    big.to_csv(app / "data" / "penguins.csv", index=False)
+
+    at = app_test(app / "main.py")
+    yield "first run", lambda: rerun(at)
+    yield "select species", lambda: set_widget(at, "selectbox", "Select a species", "Gentoo")
+    mass = widget(at.slider, "Choose a maximum body mass")
+    yield "move mass slider", lambda: set_widget(at, "slider", "Choose a maximum body mass", (mass.min + mass.max) / 2)
+    bill = widget(at.slider, "Bill length (mm)")
+    yield "bill length range", lambda: set_widget(at, "slider", "Bill length (mm)", (bill.min + 5, bill.max - 5))
+
+
+@scenario("wdi")
+def wdi_scenario(tmp, scale):
+    app = copy_app("StreamlitAppFinal", tmp)
+    df = pd.read_csv(app / "data" / "wdi_data.csv")
+    data, footer = df[df["Country Code"].notna()], df[df["Country Code"].isna()]
+    # Every copy is a new "country", so the country list (and the cube) grows with the scale
+    copies = [data] + [data.assign(**{"Country Name": data["Country Name"] + f" {k}", "Country Code": data["Country Code"] + str(k)})
+                       for k in range(1, scale)]
+    pd.concat(copies + [footer], ignore_index=True).to_csv(app / "data" / "wdi_data.csv", index=False)
+
+    at = app_test(app / "main.py")
+    yield "first run (parse + build cube)", lambda: rerun(at)
+    yield "rerun (cached)", lambda: rerun(at)
+    countries = widget(at.multiselect, "Select countries to compare").options
+    yield "select 10 countries", lambda: set_widget(at, "multiselect", "Select countries to compare", countries[:10])
+    years = widget(at.slider, "Select year range")
+    yield "narrow year range", lambda: set_widget(at, "slider", "Select year range", (years.min + 5, years.max - 5))
+    yield "dashboard view", lambda: set_widget(at, "radio", "View", "Dashboard (multiple indicators)")
+    yield "Vega-Lite backend", lambda: set_widget(at, "radio", "Chart backend", "Vega-Lite")
+    # A fresh session on the same server: the cube is read back from the on-disk store instead of the CSV
+    second = app_test(app / "main.py")
+    yield "new session (cube from disk)", lambda: rerun(second)
+
+
+@scenario("olympics")
+def olympics_scenario(tmp, scale):
+    # The tidy-data project is a notebook, not an app, so its two modules are timed directly
+    app = copy_app("TidyData-Project", tmp)
+    sys.path.insert(0, str(app))
+    from medal_cube import MedalCube
+    from tidy_transform import read_tidy
+
+    df = pd.read_csv(app / "olympics.csv")
+    copies = [df] + [df.assign(medalist_name=df["medalist_name"] + f" {k}") for k in range(1, scale)]
+    path = app / "olympics.csv"
+    pd.concat(copies, ignore_index=True).to_csv(path, index=False)
+
+    state = {}
+    yield "read + tidy", lambda: state.update(tidy=read_tidy(path))
+    yield "read + tidy (chunked)", lambda: read_tidy(path, chunksize=10_000)
+    yield "build cube", lambda: state.update(cube=MedalCube.from_tidy(state["tidy"]))
+    yield "cube tables", lambda: [state["cube"].table("sport", "medal"), state["cube"].table("sport", "gender", fill_value=0),
+                                  state["cube"].value_counts("sport")]
+
+
+NER_PARAGRAPH = ("Jeff Bezos met Tim Cook in Charlotte, North Carolina on Monday. They talked about Amazon and Apple "
+                 "opening new offices near Home Depot headquarters in Atlanta. Later, Satya Nadella joined the call from "
+                 "Seattle to discuss a $2 billion investment with the United Nations.")
+
+
+@scenario("ner")
+def ner_scenario(tmp, scale):
+    app = copy_app("NERStreamlitApp", tmp)
+    paragraphs = [f"{NER_PARAGRAPH} (Section {i}.)" for i in range(scale * 10)]
+    long_text = "\n\n".join(paragraphs)
+    edited = "\n\n".join(paragraphs[:-1] + ["Barack Obama visited Paris, France with Microsoft executives."])
+
+    at = app_test(app / "main.py")
+    label = "Alternatively, paste your text here:"
+    yield "first run (example text)", lambda: rerun(at)
+    yield "paste long text", lambda: set_widget(at, "text_area", label, long_text)
+    yield "edit last paragraph", lambda: set_widget(at, "text_area", label, edited)
+    yield "custom patterns only", lambda: set_widget(at, "radio", "Recognition mode", "Custom patterns only (faster)")
+
+    # Only long enough texts are split into pages
+    pages = [element for element in at.number_input if element.label.startswith("Page (of")]
+    if pages:
+        yield "last page", lambda: set_widget(at, "number_input", "Page (of", pages[0].max)
+
+
+@scenario("sentiment")
+def sentiment_scenario(tmp, scale):
+    app = copy_app("EOC2-Classwork/Week_11", tmp)
+    reviews = pd.DataFrame({"review": ["I love it, great product!", "Terrible. Would not buy again.",
+                                       "It is okay, nothing special.", "Excellent value and fast delivery"] * (scale * 250)})
+    input_path = tmp / "reviews.csv"
+    reviews.to_csv(input_path, index=False)
+
+    at = app_test(app / "week11_2-1.py")
+    yield "first run", lambda: rerun(at)
+    yield "type a review", lambda: set_widget(at, "text_area", "Enter your review:", "What a great and excellent phone")
+    yield "enter file path", lambda: set_widget(at, "text_input", "Path to a CSV or JSONL file", str(input_path))
+
+    def score():
+        widget(at.checkbox, "Resume from the last checkpoint").uncheck()
+        widget(at.button, "Start scoring").click()
+        rerun(at)
+    yield "score file (rule-based)", score
+
+
+# Running
+def _rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10 # Bytes on macOS, kilobytes on Linux
+
+
+def measure(action):
+    tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), time.process_time()
+    action()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    _, peak = tracemalloc.get_traced_memory()
+    return {"wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "alloc_peak_mb": round(peak / 2**20, 2), "rss_peak_mb": _rss_mb()}
+
+
+def run_worker(name, scale):
+    """Run one scenario at one scale in this process and return its results."""
+    steps, error = {}, None
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as tmp:
+        tracemalloc.start()
+        try:
+            for step, action in SCENARIOS[name](Path(tmp), scale):
+                steps[step] = measure(action)
+        except Exception as exc: # Recorded, so the other scenarios still run
+            error = f"{type(exc).__name__}: {exc}"
+        finally:
+            tracemalloc.stop()
+    return {"steps": steps, "error": error}
+
+
+def run_in_subprocess(name, scale, timeout):
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "result.json"
+        try:
+            proc = subprocess.run([sys.executable, __file__, "--worker", name, str(scale), str(out)], cwd=ROOT,
+                                  capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"steps": {}, "error": f"Timed out after {timeout} s"}
+        if not out.exists():
+            return {"steps": {}, "error": (proc.stderr.strip().splitlines() or ["Worker failed"])[-1]}
+        return json.loads(out.read_text())
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every metric that is more than tolerance above the baseline."""
+    regressions = []
+    for key, result in results.items():
+        old_steps = baseline.get(key, {}).get("steps", {})
+        for step, metrics in result["steps"].items():
+            old = old_steps.get(step)
+            if old is None:
+                continue
+            for metric, min_delta in METRICS:
+                new_value, old_value = metrics.get(metric), old.get(metric)
+                if new_value is None or not old_value:
+                    continue
+                if new_value > old_value * (1 + tolerance) and new_value - old_value > min_delta:
+                    regressions.append(f"{key} / {step}: {metric} {old_value:g} -> {new_value:g} ({new_value / old_value - 1:+.0%})")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scenario':<18}{'step':<34}{'wall s':>9}{'cpu s':>9}{'alloc MB':>10}{'RSS MB':>9}")
+    for key, result in results.items():
+        for step, m in result["steps"].items():
+            rss = f"{m['rss_peak_mb']:.0f}" if m["rss_peak_mb"] is not None else "-"
+            print(f"{key:<18}{step:<34}{m['wall_s']:>9.2f}{m['cpu_s']:>9.2f}{m['alloc_peak_mb']:>10.1f}{rss:>9}")
+        if result["error"]:
+            print(f"{key:<18}FAILED: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Streamlit apps headlessly at synthetic data sizes.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Multiples of the bundled data sizes")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Save this run's results into the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed increase over the baseline (0.25 = 25%%)")
+    parser.add_argument("--timeout", type=int, default=3600, help="Seconds allowed per scenario and scale")
+    parser.add_argument("--worker", nargs=3, metavar=("SCENARIO", "SCALE", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        name, scale, output = args.worker
+        Path(output).write_text(json.dumps(run_worker(name, int(scale))))
+        return 0
+
+    results = {}
+    for name in args.only or sorted(SCENARIOS):
+        for scale in args.scales:
+            key = f"{name}@{scale}x"
+            print(f"Running {key} ...", flush=True)
+            results[key] = run_in_subprocess(name, scale, args.timeout)
+    print()
+    print_table(results)
+
+    saved = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+    regressions = compare(results, saved["results"], args.tolerance)
+    failed = [key for key, result in results.items() if result["error"]]
+    if args.update_baseline or not args.baseline.exists():
+        # Only the scenarios that ran (and finished) are replaced; the rest of the baseline is kept
+        saved["results"].update({key: result for key, result in results.items() if not result["error"]})
+        saved.update(updated=datetime.now(timezone.utc).isoformat(timespec="seconds"), python=platform.python_version(),
+                     platform=platform.platform(), machine=platform.machine())
+        args.baseline.write_text(json.dumps(saved, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s) (more than {args.tolerance:.0%} over {args.baseline}):")
+        for line in regressions:
+            print(f"  {line}")
+    else:
+        print(f"\nNo regressions against {args.baseline}")
+    return 1 if (regressions and not args.update_baseline) or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
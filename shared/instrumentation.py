@@ -0,0 +1,174 @@
+# Optional per-stage timing and memory instrumentation
+# Stages of the app are wrapped in `with span("name"):` blocks (or functions in @timed("name")). With the environment
+# variable APP_PROFILE=1 set, every rerun records each stage's wall time, CPU time and tracemalloc memory (net change
+# and peak), shows them in a "Performance" panel in the sidebar and, if APP_PROFILE_LOG is set to a file path, appends
+# the rerun as one JSON line to that log (rotated once it passes APP_PROFILE_LOG_MB megabytes).
+# Without APP_PROFILE, span() hands back one shared do-nothing context manager and timed() returns the function
+# unchanged, so the instrumented code costs the same as before.
+#
+# Notes on the numbers:
+#   - CPU time is the script thread's own (time.thread_time), so other sessions don't count towards it
+#   - tracemalloc sees the whole process, so allocations made by other sessions at the same time show up too, and
+#     tracing itself slows Python code down (which is why it is only on when asked for)
+# Shared by the Country Comparison App and the NER app: each app's main.py adds this folder to sys.path.
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+ENABLED = os.environ.get("APP_PROFILE", "").strip().lower() not in ("", "0", "false", "no", "off")
+LOG_PATH = os.environ.get("APP_PROFILE_LOG", "").strip()
+LOG_MAX_MB = float(os.environ.get("APP_PROFILE_LOG_MB", "10"))
+LOG_BACKUPS = 3 # Rotated files kept next to the log (log.1, log.2, ...)
+MB = 2 ** 20
+
+_NULL_SPAN = nullcontext()
+_local = threading.local() # Each session's script runs in its own thread, so each thread records its own rerun
+_logger = None
+_logger_lock = threading.Lock()
+
+
+class Span:
+    """One timed stage. Spans opened inside another span are recorded as "outer / inner"."""
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.recorder._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder._exit(self)
+        return False
+
+
+class Recorder:
+    """Stage timings for one rerun of the script."""
+
+    def __init__(self, app):
+        self.app = app
+        self.stages = {} # Stage path -> totals (a stage entered several times, e.g. once per chart, is summed)
+        self._stack = []
+        self.total = None
+        self._root = Span(self, "total")
+        self._enter(self._root)
+
+    def span(self, name):
+        return Span(self, name)
+
+    def _note_peak(self, peak):
+        # tracemalloc has one peak for the whole process, so before it is reset for a new span the peak so far is
+        # handed to every span that is still open
+        for open_span in self._stack:
+            open_span.peak = max(open_span.peak, peak)
+
+    def _enter(self, span):
+        current, peak = tracemalloc.get_traced_memory()
+        self._note_peak(peak)
+        tracemalloc.reset_peak()
+        names = [open_span.name for open_span in self._stack[1:]] + [span.name] # Without the root span
+        span.path = " / ".join(names)
+        span.memory = span.peak = current
+        if span is not self._root and span.path not in self.stages: # Listed in the order the stages start
+            self.stages[span.path] = {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "alloc_mb": 0.0, "peak_mb": 0.0}
+        span.wall, span.cpu = time.perf_counter(), time.thread_time()
+        self._stack.append(span)
+
+    def _exit(self, span):
+        wall, cpu = time.perf_counter() - span.wall, time.thread_time() - span.cpu
+        current, peak = tracemalloc.get_traced_memory()
+        self._note_peak(peak)
+        self._stack.remove(span)
+        stats = {"calls": 1, "wall_s": wall, "cpu_s": cpu, "alloc_mb": (current - span.memory) / MB, "peak_mb": (span.peak - span.memory) / MB}
+        if span is self._root:
+            self.total = stats
+            return
+        stage = self.stages[span.path]
+        for key in ("calls", "wall_s", "cpu_s", "alloc_mb"):
+            stage[key] += stats[key]
+        stage["peak_mb"] = max(stage["peak_mb"], stats["peak_mb"])
+
+    def finish(self):
+        if self.total is None:
+            self._exit(self._root)
+        return self.total
+
+    def to_dict(self):
+        return {"time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "app": self.app, "total": self.total, "stages": self.stages}
+
+
+def start_rerun(app):
+    """Start recording this rerun; call at the top of the script. Does nothing unless APP_PROFILE is set."""
+    if not ENABLED:
+        return None
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _local.recorder = Recorder(app)
+    return _local.recorder
+
+
+def span(name):
+    """Context manager timing one stage of the current rerun."""
+    if not ENABLED:
+        return _NULL_SPAN
+    recorder = getattr(_local, "recorder", None)
+    return recorder.span(name) if recorder is not None else _NULL_SPAN
+
+
+def timed(name):
+    """Decorator version of span(): every call of the function is added to the stage."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = logging.getLogger("app_profile")
+            _logger.setLevel(logging.INFO)
+            _logger.propagate = False # Only into the JSONL file, not the server's console
+            handler = RotatingFileHandler(LOG_PATH, maxBytes=int(LOG_MAX_MB * MB), backupCount=LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _logger.addHandler(handler)
+    return _logger
+
+
+def show_panel():
+    """Finish the rerun: show its stages in a sidebar expander and write them to the log.
+
+    Call it at the end of the script, and before any st.stop() that ends a normal rerun early.
+    """
+    recorder = getattr(_local, "recorder", None) if ENABLED else None
+    if recorder is None:
+        return
+    _local.recorder = None
+    total = recorder.finish()
+    if LOG_PATH:
+        _get_logger().info(json.dumps(recorder.to_dict()))
+
+    import pandas as pd
+    import streamlit as st
+    with st.sidebar.expander("⏱️ Performance (this rerun)"):
+        st.caption(f"Total: {total['wall_s'] * 1000:,.0f} ms wall, {total['cpu_s'] * 1000:,.0f} ms CPU, "
+                   f"{total['alloc_mb']:+.1f} MB allocated (peak {total['peak_mb']:.1f} MB)")
+        rows = [{"stage": path, "calls": stage["calls"], "wall ms": stage["wall_s"] * 1000, "CPU ms": stage["cpu_s"] * 1000,
+                 "alloc MB": stage["alloc_mb"], "peak MB": stage["peak_mb"]} for path, stage in recorder.stages.items()]
+        if rows:
+            st.dataframe(pd.DataFrame(rows).round(1), hide_index=True)
+        st.caption("Memory is measured with tracemalloc for the whole server process, so other sessions can add to it.")